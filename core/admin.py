@@ -1,7 +1,9 @@
 from django.contrib import admin
 from .models import (
     UserProfile, Property, OwnerOffer, VoucherProduct, Voucher, Booking,
-    OfferInventoryDay, OTPVerification, Payment, Payout, AuditLog, OutboundMessage
+    OfferInventoryDay, OTPVerification, Payment, Payout, AuditLog, OutboundMessage,
+    OfferSkuEligibility, OfferInventoryMonth, IdempotencyKey, OutboxEvent, JobCheckpoint, VoucherCode,
+    VoucherOrder,
 )
 
 admin.site.register(UserProfile)
@@ -16,3 +18,10 @@ admin.site.register(Payment)
 admin.site.register(Payout)
 admin.site.register(AuditLog)
 admin.site.register(OutboundMessage)
+admin.site.register(OfferSkuEligibility)
+admin.site.register(OfferInventoryMonth)
+admin.site.register(IdempotencyKey)
+admin.site.register(OutboxEvent)
+admin.site.register(JobCheckpoint)
+admin.site.register(VoucherCode)
+admin.site.register(VoucherOrder)
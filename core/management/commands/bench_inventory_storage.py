@@ -0,0 +1,123 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from core.models import OfferInventoryDay, OfferInventoryMonth, OwnerOffer, Property
+from core.services.inventory import (
+    InventoryError, materialize_inventory, release_reserved_or_booked, reserve_or_book_inventory,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the rows and monthly inventory layouts: reserve/release latency and storage "
+        "size over the same throwaway offers and horizon. Everything runs in a transaction "
+        "that is rolled back; live offers and inventory are not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--offers", type=int, default=50, help="Throwaway offers to create")
+        parser.add_argument("--ops", type=int, default=500, help="Reserve/release pairs per layout")
+        parser.add_argument("--days", type=int, default=365, help="Horizon to materialize")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["offers"] < 1 or options["days"] < 8:
+            raise CommandError("Need at least one offer and an 8-day horizon")
+        rnd = random.Random(options["seed"])
+        units = [rnd.randint(1, 5) for _ in range(options["offers"])]
+        stays = []
+        for _ in range(options["ops"]):
+            nights = rnd.randint(1, 7)
+            offset = rnd.randrange(options["days"] - nights)
+            stays.append((rnd.randrange(options["offers"]), offset, nights))
+
+        previous = settings.INVENTORY_STORAGE, settings.INVENTORY_ENGINE
+        try:
+            for storage, model in (("rows", OfferInventoryDay), ("monthly", OfferInventoryMonth)):
+                settings.INVENTORY_STORAGE, settings.INVENTORY_ENGINE = storage, "conditional"
+                self._bench(storage, model, units, stays, options["days"])
+        finally:
+            settings.INVENTORY_STORAGE, settings.INVENTORY_ENGINE = previous
+
+    def _throwaway_offers(self, units: list[int], days: int) -> list[OwnerOffer]:
+        """
+        Offers under a throwaway owner and property. bulk_create skips the save signals,
+        so nothing is indexed or materialized until the benchmark asks for it.
+        """
+        today = timezone.localdate()
+        owner = User.objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+        prop = Property(owner=owner, name="Inventory benchmark", city="bench", is_active=False)
+        Property.objects.bulk_create([prop])
+        return OwnerOffer.objects.bulk_create(
+            OwnerOffer(
+                property=prop, room_type=f"bench-{i}", start_date=today,
+                end_date=today + timedelta(days=days), units_per_day=n, private_rate_kobo=0, eligible_skus=[],
+            )
+            for i, n in enumerate(units)
+        )
+
+    def _storage_bytes(self, model, offers) -> int:
+        """
+        Size (heap, TOAST and indexes) of just the benchmarked rows: copy them into a
+        fresh temp table with the same indexes, so other offers' rows and dead tuples
+        in the real table don't count.
+        """
+        table = model._meta.db_table
+        with connection.cursor() as cur:
+            cur.execute(f"CREATE TEMP TABLE bench_{table} (LIKE {table} INCLUDING INDEXES) ON COMMIT DROP")
+            cur.execute(
+                f"INSERT INTO bench_{table} SELECT * FROM {table} WHERE offer_id = ANY(%s)",
+                [[o.id for o in offers]],
+            )
+            cur.execute(f"ANALYZE bench_{table}")
+            cur.execute("SELECT pg_total_relation_size(%s)", [f"bench_{table}"])
+            return cur.fetchone()[0]
+
+    def _bench(self, storage, model, units, stays, days):
+        today = timezone.localdate()
+        try:
+            with transaction.atomic():
+                offers = self._throwaway_offers(units, days)
+                materialize_inventory([o.id for o in offers], horizon_days=days)
+                rows = model.objects.filter(offer__in=offers).count()
+                size = self._storage_bytes(model, offers)
+
+                timings, failures = [], 0
+                started = time.perf_counter()
+                for i, offset, nights in stays:
+                    offer, check_in = offers[i], today + timedelta(days=offset)
+                    check_out = check_in + timedelta(days=nights)
+                    t0 = time.perf_counter()
+                    try:
+                        reserve_or_book_inventory(
+                            offer=offer, check_in=check_in, check_out=check_out, units=1, mode="reserve"
+                        )
+                        release_reserved_or_booked(
+                            offer=offer, check_in=check_in, check_out=check_out, units=1, mode="reserve"
+                        )
+                    except InventoryError:
+                        failures += 1
+                    timings.append(time.perf_counter() - t0)
+                elapsed = time.perf_counter() - started
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        timings.sort()
+        p50 = timings[len(timings) // 2] * 1000 if timings else 0
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000 if timings else 0
+        ops = 2 * len(timings) / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{storage:8} rows={rows} storage_bytes={size} ops/s={ops:.0f} "
+            f"p50={p50:.2f}ms p99={p99:.2f}ms failures={failures}"
+        )
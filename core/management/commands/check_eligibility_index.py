@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.services.eligibility_index import sync_all
+
+
+class Command(BaseCommand):
+    help = "Report drift between OfferSkuEligibility and OwnerOffer.eligible_skus + product gates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sku", action="append", dest="skus", help="Limit to this SKU (repeatable)")
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for sku, diff in sync_all(dry_run=True, skus=options["skus"]).items():
+            if diff.ok:
+                continue
+            drifted += 1
+            for _sku, offer_id in sorted(diff.missing, key=str):
+                self.stdout.write(f"{sku}: missing offer {offer_id}")
+            for _sku, offer_id in sorted(diff.stale, key=str):
+                self.stdout.write(f"{sku}: stale offer {offer_id}")
+        if drifted:
+            raise CommandError(f"Eligibility index drift in {drifted} SKU(s); run rebuild_eligibility_index")
+        self.stdout.write(self.style.SUCCESS("Eligibility index consistent"))
@@ -0,0 +1,55 @@
+import random
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.models import OwnerOffer, Voucher, VoucherStatus
+from core.services.eligibility import is_offer_eligible, query_eligible_offers
+
+
+class Command(BaseCommand):
+    help = (
+        "Read-only parity check: is_offer_eligible must agree with query_eligible_offers "
+        "for randomly sampled active vouchers, check-in dates and offers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=100, help="Voucher/date pairs to check")
+        parser.add_argument("--offers", type=int, default=20, help="Extra random offers per pair")
+        parser.add_argument("--days", type=int, default=60, help="Check-in window from today")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        voucher_ids = list(Voucher.objects.filter(status=VoucherStatus.ACTIVE).values_list("id", flat=True))
+        if not voucher_ids:
+            self.stdout.write("No active vouchers to sample")
+            return
+
+        today = timezone.localdate()
+        checked = mismatches = 0
+        for _ in range(options["samples"]):
+            voucher = Voucher.objects.select_related("voucher_product").get(id=rnd.choice(voucher_ids))
+            vp = voucher.voucher_product
+            check_in = today + timedelta(days=rnd.randrange(options["days"]))
+            check_out = check_in + timedelta(days=voucher.nights_included)
+            units = rnd.choice([None, 1])
+
+            eligible = {o.id for o, _score in query_eligible_offers(voucher, check_in, check_out, units=units)}
+            others = list(
+                OwnerOffer.objects.filter(property__city=vp.city).order_by("?")
+                .values_list("id", flat=True)[: options["offers"]]
+            )
+            offers = OwnerOffer.objects.select_related("property").filter(id__in=eligible | set(others))
+            for offer in offers:
+                check = is_offer_eligible(voucher, offer, check_in, check_out, units=units)
+                checked += 1
+                if check.ok != (offer.id in eligible):
+                    mismatches += 1
+                    self.stdout.write(
+                        f"{vp.sku} {check_in}..{check_out} units={units} offer {offer.id}: "
+                        f"query={offer.id in eligible} single={check.ok} ({check.reason})"
+                    )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} of {checked} single-offer checks disagree with the query")
+        self.stdout.write(self.style.SUCCESS(f"{checked} single-offer checks agree with the query"))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from core.services.notifications import MessageDispatcher
+
+
+class Command(BaseCommand):
+    help = "Send queued outbound messages (OTP over WhatsApp, falling back to SMS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--whatsapp-workers", type=int, help="Concurrent WhatsApp sends (default MESSAGE_CONCURRENCY)")
+        parser.add_argument("--sms-workers", type=int, help="Concurrent SMS sends (default MESSAGE_CONCURRENCY)")
+        parser.add_argument("--loop", action="store_true", help="Keep running; poll every --interval seconds when idle")
+        parser.add_argument("--interval", type=float, default=0.5)
+
+    def handle(self, *args, **options):
+        concurrency = dict(settings.MESSAGE_CONCURRENCY)
+        for channel in ("whatsapp", "sms"):
+            if options[f"{channel}_workers"]:
+                concurrency[channel] = options[f"{channel}_workers"]
+        dispatcher = MessageDispatcher(concurrency)
+        try:
+            if not options["loop"]:
+                self.stdout.write(f"Made {dispatcher.drain()} send attempt(s)")
+                return
+            while True:
+                claimed = dispatcher.step(timeout=options["interval"])
+                if not claimed and not dispatcher.in_flight:
+                    time.sleep(options["interval"])
+        finally:
+            dispatcher.close()
@@ -0,0 +1,52 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.services.outbox import drain_batch, purge_processed
+
+PURGE_EVERY_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox events (audit log, notifications, ...) to their subscribers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=1, help="Concurrent drainers (threads)")
+        parser.add_argument("--loop", action="store_true", help="Keep draining; sleep --interval seconds when idle")
+        parser.add_argument("--interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        totals = []
+        lock = threading.Lock()
+        last_purge = [time.monotonic()]
+
+        def work():
+            drained = 0
+            try:
+                while True:
+                    n = drain_batch(options["batch_size"])
+                    drained += n
+                    if n:
+                        continue
+                    if not options["loop"]:
+                        return
+                    with lock:
+                        purge_due = time.monotonic() - last_purge[0] > PURGE_EVERY_SECONDS
+                        if purge_due:
+                            last_purge[0] = time.monotonic()
+                    if purge_due:
+                        purge_processed()
+                    time.sleep(options["interval"])
+            finally:
+                with lock:
+                    totals.append(drained)
+                connections.close_all()
+
+        threads = [threading.Thread(target=work) for _ in range(options["workers"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        purged = purge_processed()
+        self.stdout.write(f"Delivered {sum(totals)} event(s); purged {purged} processed event(s)")
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from core.services.expiry import expire_overdue_bookings
+
+
+class Command(BaseCommand):
+    help = "Cancel PENDING bookings past confirm_by, releasing their reserved inventory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--loop", action="store_true", help="Keep running, sweeping every --interval seconds")
+        parser.add_argument("--interval", type=int, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            result = expire_overdue_bookings(batch_size=options["batch_size"])
+            self.stdout.write(f"Expired {result.expired} booking(s) in {result.batches} batch(es)")
+            if result.failed:
+                self.stderr.write(f"Left pending after release failure: {', '.join(map(str, result.failed))}")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from core.services.inventory import materialize_inventory
+
+
+class Command(BaseCommand):
+    help = "Materialize inventory rows (per INVENTORY_STORAGE) for active offers up to the rolling horizon."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Horizon in days (default INVENTORY_HORIZON_DAYS)")
+        parser.add_argument("--loop", action="store_true", help="Keep running, extending every --interval seconds")
+        parser.add_argument("--interval", type=int, default=24 * 3600)
+
+    def handle(self, *args, **options):
+        while True:
+            created = materialize_inventory(horizon_days=options["days"])
+            self.stdout.write(f"Inventory horizon extended: {created} row(s) created")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,221 @@
+import hashlib
+import heapq
+import hmac
+import itertools
+import json
+import random
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+WEBHOOK_EVENTS = {"success": "charge.success", "failed": "charge.failed"}
+
+
+class FakeGateway:
+    """
+    In-memory stand-in for the Paystack transaction API. Initialized transactions are
+    settled after --settle-after-ms (success, or failed with --decline-rate), and a
+    charge.success or charge.failed webhook is queued with a random delay, so deliveries
+    arrive out of order; --duplicate-rate re-sends some of them later with the same
+    event identity.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.secret = options["secret"] or settings.PAYSTACK_SECRET_KEY
+        self.lock = threading.Lock()
+        self.transactions: dict[str, dict] = {}
+        self.ids = itertools.count(1_000_000)
+        self.deliveries: list = []  # heap of (due, seq, body)
+        self.seq = itertools.count()
+        self.wake = threading.Condition(self.lock)
+        self.sender = ThreadPoolExecutor(max_workers=options["webhook_workers"], thread_name_prefix="webhook")
+        self.stats = {"initialized": 0, "verified": 0, "injected_failures": 0, "webhooks_sent": 0, "webhooks_failed": 0}
+
+    # API
+
+    def initialize(self, body: dict) -> tuple[int, dict]:
+        reference = body.get("reference") or secrets.token_hex(8)
+        with self.lock:
+            if reference in self.transactions:
+                return 400, {"status": False, "message": "Duplicate Transaction Reference"}
+            access_code = secrets.token_hex(8)
+            self.transactions[reference] = {
+                "id": next(self.ids),
+                "reference": reference,
+                "amount": body.get("amount"),
+                "currency": "NGN",
+                "status": "abandoned",
+                "customer": {"email": body.get("email")},
+                "metadata": body.get("metadata") or {},
+                "access_code": access_code,
+                "created_at": timezone.now().isoformat(),
+                "paid_at": None,
+            }
+            self.stats["initialized"] += 1
+        if self.options["settle_after_ms"] > 0:
+            timer = threading.Timer(self.options["settle_after_ms"] / 1000, self.settle, args=(reference,))
+            timer.daemon = True
+            timer.start()
+        data = {
+            "authorization_url": f"{self.options['public_url']}/checkout/{access_code}",
+            "access_code": access_code,
+            "reference": reference,
+        }
+        return 200, {"status": True, "message": "Authorization URL created", "data": data}
+
+    def verify(self, reference: str) -> tuple[int, dict]:
+        with self.lock:
+            txn = self.transactions.get(reference)
+            self.stats["verified"] += 1
+            if txn is None:
+                return 400, {"status": False, "message": "Transaction reference not found"}
+            return 200, {"status": True, "message": "Verification successful", "data": dict(txn)}
+
+    def settle(self, reference: str, outcome: str | None = None) -> dict | None:
+        with self.lock:
+            txn = self.transactions.get(reference)
+            if txn is None or txn["status"] != "abandoned":
+                return txn
+            if outcome is None:
+                outcome = "failed" if random.random() < self.options["decline_rate"] else "success"
+            txn["status"] = outcome
+            if outcome == "success":
+                txn["paid_at"] = timezone.now().isoformat()
+            body = json.dumps({"event": WEBHOOK_EVENTS[outcome], "data": dict(txn)}).encode()
+            self._schedule(body)
+            if random.random() < self.options["duplicate_rate"]:
+                self._schedule(body, extra=self.options["webhook_max_delay_ms"])
+            return txn
+
+    # Webhook delivery
+
+    def _schedule(self, body: bytes, extra: float = 0):
+        delay = (random.uniform(0, self.options["webhook_max_delay_ms"]) + extra) / 1000
+        heapq.heappush(self.deliveries, (time.monotonic() + delay, next(self.seq), body))
+        self.wake.notify()
+
+    def run_deliveries(self):
+        while True:
+            with self.lock:
+                while not self.deliveries or self.deliveries[0][0] > time.monotonic():
+                    self.wake.wait(timeout=self.deliveries[0][0] - time.monotonic() if self.deliveries else None)
+                _, _, body = heapq.heappop(self.deliveries)
+            self.sender.submit(self._send, body)
+
+    def _send(self, body: bytes):
+        signature = hmac.new(self.secret.encode("utf-8"), msg=body, digestmod=hashlib.sha512).hexdigest()
+        try:
+            r = requests.post(
+                self.options["webhook_url"], data=body, timeout=10,
+                headers={"Content-Type": "application/json", "X-Paystack-Signature": signature},
+            )
+            ok = r.status_code == 200
+        except requests.RequestException:
+            ok = False
+        with self.lock:
+            self.stats["webhooks_sent" if ok else "webhooks_failed"] += 1
+
+
+def make_handler(gateway: FakeGateway):
+    options = gateway.options
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if options["verbosity"] > 1:
+                super().log_message(fmt, *args)
+
+        def _reply(self, code: int, body: dict):
+            raw = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _api_call(self) -> bool:
+            """Apply auth, latency and failure injection; False if a response was already sent."""
+            if self.headers.get("Authorization") != f"Bearer {gateway.secret}":
+                self._reply(401, {"status": False, "message": "Invalid key"})
+                return False
+            latency = max(0.0, random.gauss(options["latency_ms"], options["latency_jitter_ms"]))
+            time.sleep(latency / 1000)
+            if random.random() < options["failure_rate"]:
+                with gateway.lock:
+                    gateway.stats["injected_failures"] += 1
+                self._reply(random.choice([500, 502, 503]), {"status": False, "message": "Injected failure"})
+                return False
+            return True
+
+        def do_GET(self):
+            if self.path.startswith("/transaction/verify/"):
+                if self._api_call():
+                    self._reply(*gateway.verify(self.path.rsplit("/", 1)[1]))
+            elif self.path == "/_fake/stats":
+                with gateway.lock:
+                    self._reply(200, {**gateway.stats, "pending_webhooks": len(gateway.deliveries)})
+            else:
+                self._reply(404, {"status": False, "message": "Not found"})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path == "/transaction/initialize":
+                if self._api_call():
+                    self._reply(*gateway.initialize(json.loads(body or b"{}")))
+            elif self.path.startswith("/_fake/transactions/"):
+                # /_fake/transactions/<reference>/success|failed: settle by hand (use --settle-after-ms 0)
+                parts = self.path.split("/")
+                if len(parts) != 5 or not parts[3] or parts[4] not in WEBHOOK_EVENTS:
+                    self._reply(404, {"status": False, "message": "Expected /_fake/transactions/<reference>/success|failed"})
+                    return
+                txn = gateway.settle(parts[3], parts[4])
+                self._reply(200 if txn else 404, {"status": bool(txn), "data": txn})
+            else:
+                self._reply(404, {"status": False, "message": "Not found"})
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local fake Paystack (transaction/initialize, transaction/verify, signed webhooks) "
+        "with injectable latency and failures. Point PAYSTACK_BASE_URL at it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8090)
+        parser.add_argument("--secret", default="", help="Secret key (default PAYSTACK_SECRET_KEY)")
+        parser.add_argument("--webhook-url", default="http://127.0.0.1:8000/api/v1/payments/webhook")
+        parser.add_argument("--latency-ms", type=float, default=150)
+        parser.add_argument("--latency-jitter-ms", type=float, default=50)
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of API calls answered with 5xx")
+        parser.add_argument("--settle-after-ms", type=float, default=1000, help="0: settle only via /_fake/transactions")
+        parser.add_argument("--decline-rate", type=float, default=0.1)
+        parser.add_argument("--duplicate-rate", type=float, default=0.2, help="Share of webhooks delivered twice")
+        parser.add_argument("--webhook-max-delay-ms", type=float, default=2000)
+        parser.add_argument("--webhook-workers", type=int, default=8)
+
+    def handle(self, *args, **options):
+        gateway = FakeGateway({**options, "public_url": f"http://{options['host']}:{options['port']}"})
+        if not gateway.secret:
+            self.stderr.write("No secret key: pass --secret or set PAYSTACK_SECRET_KEY")
+            return
+        threading.Thread(target=gateway.run_deliveries, daemon=True).start()
+        server = ThreadingHTTPServer((options["host"], options["port"]), make_handler(gateway))
+        self.stdout.write(f"Fake Paystack on http://{options['host']}:{options['port']} -> webhooks to {options['webhook_url']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            gateway.sender.shutdown(wait=False)
@@ -0,0 +1,38 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core.models import VoucherProduct
+from core.services.bulk_vouchers import EXPORTERS, create_voucher_order
+
+
+class Command(BaseCommand):
+    help = "Issue an invoiced (paid offline) order of ACTIVE vouchers and stream their codes as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sku", required=True)
+        parser.add_argument("--quantity", type=int, required=True)
+        parser.add_argument("--username", required=True, help="Account the vouchers are issued to")
+        parser.add_argument("--output", choices=sorted(EXPORTERS), default="csv")
+        parser.add_argument("--file", default="-", help="Destination (default stdout)")
+
+    def handle(self, *args, **options):
+        if options["quantity"] < 1:
+            raise CommandError("--quantity must be positive")
+        try:
+            vp = VoucherProduct.objects.get(sku=options["sku"], is_active=True)
+            user = get_user_model().objects.get(username=options["username"])
+        except (VoucherProduct.DoesNotExist, get_user_model().DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        order, payment = create_voucher_order(
+            user=user, voucher_product=vp, quantity=options["quantity"], paid_offline=True
+        )
+        stream, _ = EXPORTERS[options["output"]]
+        out = sys.stdout if options["file"] == "-" else open(options["file"], "w", newline="")
+        try:
+            for chunk in stream(order):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        self.stderr.write(f"Issued {order.quantity} voucher(s) in order {order.id} (payment {payment.reference})")
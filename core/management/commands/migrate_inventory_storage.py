@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.models import OfferInventoryDay, OfferInventoryMonth, OwnerOffer
+
+DAY = OfferInventoryDay._meta.db_table
+MONTH = OfferInventoryMonth._meta.db_table
+OFFER = OwnerOffer._meta.db_table
+
+# One row per (offer, month) that has any stored night; nights without a day row
+# take the offer's units_per_day with nothing reserved, which is what they meant.
+ROWS_TO_MONTHLY = f"""
+    INSERT INTO {MONTH} (offer_id, month, capacity, reserved, booked)
+    SELECT m.offer_id, m.month,
+           array_agg(COALESCE(d.capacity, o.units_per_day) ORDER BY n.day),
+           array_agg(COALESCE(d.reserved, 0) ORDER BY n.day),
+           array_agg(COALESCE(d.booked, 0) ORDER BY n.day)
+    FROM (SELECT DISTINCT offer_id, date_trunc('month', date)::date AS month FROM {DAY}) m
+    JOIN {OFFER} o ON o.id = m.offer_id
+    CROSS JOIN LATERAL generate_series(
+        m.month::timestamp, (m.month + interval '1 month' - interval '1 day'), interval '1 day'
+    ) AS n(day)
+    LEFT JOIN {DAY} d ON d.offer_id = m.offer_id AND d.date = n.day::date
+    GROUP BY m.offer_id, m.month
+    ON CONFLICT (offer_id, month) DO UPDATE
+    SET capacity = EXCLUDED.capacity, reserved = EXCLUDED.reserved, booked = EXCLUDED.booked
+"""
+
+MONTHLY_TO_ROWS = f"""
+    INSERT INTO {DAY} (offer_id, date, capacity, reserved, booked)
+    SELECT m.offer_id, m.month + (t.i::int - 1), t.c, t.r, t.b
+    FROM {MONTH} m
+    CROSS JOIN LATERAL unnest(m.capacity, m.reserved, m.booked) WITH ORDINALITY AS t(c, r, b, i)
+    ON CONFLICT (offer_id, date) DO UPDATE
+    SET capacity = EXCLUDED.capacity, reserved = EXCLUDED.reserved, booked = EXCLUDED.booked
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy inventory between OfferInventoryDay rows and OfferInventoryMonth arrays. "
+        "Both tables are locked for the copy; switch INVENTORY_STORAGE once it finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--to", choices=["monthly", "rows"], required=True)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        sql = ROWS_TO_MONTHLY if options["to"] == "monthly" else MONTHLY_TO_ROWS
+        with connection.cursor() as cur:
+            cur.execute(f"LOCK TABLE {DAY}, {MONTH} IN EXCLUSIVE MODE")
+            cur.execute(sql)
+            copied = cur.rowcount
+        target = "OfferInventoryMonth" if options["to"] == "monthly" else "OfferInventoryDay"
+        self.stdout.write(f"Copied {copied} {target} row(s)")
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from core.services.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses past their TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running, purging every --interval seconds")
+        parser.add_argument("--interval", type=int, default=3600)
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = purge_expired_keys()
+            self.stdout.write(f"Purged {deleted} expired idempotency key(s)")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
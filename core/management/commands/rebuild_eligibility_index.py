@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core.services.eligibility_index import sync_all
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized SKU<->offer eligibility index (OfferSkuEligibility)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sku", action="append", dest="skus", help="Limit to this SKU (repeatable)")
+
+    def handle(self, *args, **options):
+        added = removed = 0
+        for sku, diff in sync_all(skus=options["skus"]).items():
+            added += len(diff.missing)
+            removed += len(diff.stale)
+            if not diff.ok:
+                self.stdout.write(f"{sku}: +{len(diff.missing)} -{len(diff.stale)}")
+        self.stdout.write(self.style.SUCCESS(f"Eligibility index rebuilt: +{added} -{removed}"))
@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from core.services.payments import reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = "Verify stale PENDING payments with Paystack; resumes from the last checkpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-minutes", type=int, help="Default PAYMENT_RECONCILE_AFTER_MINUTES")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, help="Concurrent verify calls (default PAYMENT_RECONCILE_WORKERS)")
+        parser.add_argument("--max-batches", type=int)
+        parser.add_argument("--loop", action="store_true", help="Keep running; start a new pass every --interval seconds")
+        parser.add_argument("--interval", type=int, default=600)
+
+    def handle(self, *args, **options):
+        older_than = options["older_than_minutes"]
+        while True:
+            result = reconcile_pending_payments(
+                older_than=timedelta(minutes=older_than) if older_than is not None else None,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                max_batches=options["max_batches"],
+            )
+            self.stdout.write(
+                f"Checked {result.checked} payment(s) in {result.batches} batch(es): {result.succeeded} successful, "
+                f"{result.failed} failed, {result.still_pending} still pending, {result.errors} unverified"
+                + ("" if result.finished else " (stopped early; the next run resumes from the checkpoint)")
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,29 @@
+import logging
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.services.codes import available_codes, refill_voucher_code_pool
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Keep the pre-generated voucher code pool topped up."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="SV")
+        parser.add_argument("--target", type=int, help="Pool size to refill to (default VOUCHER_CODE_POOL_SIZE)")
+        parser.add_argument("--loop", action="store_true", help="Keep running; refill whenever the pool drops below VOUCHER_CODE_POOL_LOW_WATER")
+        parser.add_argument("--interval", type=int, default=30)
+
+    def handle(self, *args, **options):
+        while True:
+            available = available_codes(options["prefix"])
+            if not options["loop"] or available < settings.VOUCHER_CODE_POOL_LOW_WATER:
+                if options["loop"]:
+                    logger.warning("Voucher code pool %s below low-water mark (%d left)", options["prefix"], available)
+                added = refill_voucher_code_pool(options["prefix"], target=options["target"])
+                self.stdout.write(f"Added {added} code(s) to the {options['prefix']} pool ({available + added} available)")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
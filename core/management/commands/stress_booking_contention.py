@@ -0,0 +1,261 @@
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models import (
+    AuditLog, Booking, BookingStatus, OfferInventoryDay, OfferInventoryMonth, OutboxEvent, OwnerOffer,
+    Property, PropertyApprovalStatus, Role, UserProfile, Voucher, VoucherProduct, VoucherStatus,
+)
+from core.services.inventory import InventoryError, inventory_snapshot
+
+# SQLSTATEs reported separately from other database errors
+_SQLSTATES = {"40P01": "deadlock", "40001": "serialization_failure", "55P03": "lock_not_available"}
+_INVENTORY_TABLES = (OfferInventoryDay._meta.db_table, OfferInventoryMonth._meta.db_table)
+
+
+def _is_locking_statement(sql: str) -> bool:
+    return "FOR UPDATE" in sql or (sql.startswith("UPDATE") and any(t in sql for t in _INVENTORY_TABLES))
+
+
+def _run_cycle(task: dict) -> dict:
+    """One customer: CreateBooking, then the owner confirms or declines if it is pending."""
+    settings.INVENTORY_STORAGE, settings.INVENTORY_ENGINE = task["storage"], task["engine"]
+    from core.views.booking import CreateBooking
+    from core.views.owner import ConfirmBooking, DeclineBooking
+
+    factory = APIRequestFactory()
+    customer = User.objects.get(id=task["customer_id"])
+    owner = User.objects.get(id=task["owner_id"])
+    result = {"timings": [], "lock_seconds": 0.0, "outcomes": Counter()}
+
+    def timed_statement(execute, sql, params, many, context):
+        if not _is_locking_statement(sql):
+            return execute(sql, params, many, context)
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            result["lock_seconds"] += time.perf_counter() - t0
+
+    def call(op, view, user, path, data=None, **kwargs):
+        request = factory.post(path, data or {}, format="json")
+        force_authenticate(request, user=user)
+        t0 = time.perf_counter()
+        try:
+            response = view.as_view()(request, **kwargs)
+            outcome = f"{op}_{response.status_code}"
+        except InventoryError:
+            response, outcome = None, f"{op}_sold_out"
+        except DatabaseError as e:
+            state = getattr(e.__cause__, "sqlstate", None)
+            response, outcome = None, f"{op}_{_SQLSTATES.get(state, 'db_error')}"
+        result["timings"].append((op, time.perf_counter() - t0))
+        result["outcomes"][outcome] += 1
+        return response
+
+    with connection.execute_wrapper(timed_statement):
+        response = call(
+            "create", CreateBooking, customer, "/api/bookings",
+            {
+                "voucher_id": task["voucher_id"], "offer_id": task["offer_id"],
+                "check_in": task["check_in"], "check_out": task["check_out"],
+            },
+        )
+        if response is not None and response.status_code == 201 and response.data["status"] == BookingStatus.PENDING:
+            booking_id = response.data["id"]
+            if task["confirm"]:
+                call("confirm", ConfirmBooking, owner, f"/api/owner/bookings/{booking_id}/confirm", booking_id=booking_id)
+            else:
+                call("decline", DeclineBooking, owner, f"/api/owner/bookings/{booking_id}/decline", booking_id=booking_id)
+    connections.close_all()
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress CreateBooking/ConfirmBooking/DeclineBooking against one hot offer from a pool of "
+        "worker processes, report throughput and latency, and verify the offer never oversold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Worker processes (one DB connection each)")
+        parser.add_argument("--customers", type=int, default=200, help="Customers, each booking once")
+        parser.add_argument("--capacity", type=int, default=5, help="Hot offer units_per_day")
+        parser.add_argument("--nights", type=int, default=2)
+        parser.add_argument("--confirm-ratio", type=float, default=0.5, help="Share of pending bookings confirmed")
+        parser.add_argument("--auto-confirm", action="store_true", help="Hot offer books directly")
+        parser.add_argument("--engine", choices=["locking", "conditional"], default=None)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded data")
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        engine = options["engine"] or settings.INVENTORY_ENGINE
+        world = self._seed(options)
+        offer = world["offer"]
+        check_in, check_out = world["check_in"], world["check_out"]
+        tasks = [
+            {
+                "customer_id": customer_id, "owner_id": world["owner"].id, "voucher_id": str(voucher_id),
+                "offer_id": str(offer.id), "check_in": check_in.isoformat(), "check_out": check_out.isoformat(),
+                "confirm": rnd.random() < options["confirm_ratio"],
+                "storage": settings.INVENTORY_STORAGE, "engine": engine,
+            }
+            for customer_id, voucher_id in world["vouchers"]
+        ]
+
+        violations = []
+        stop = threading.Event()
+        monitor = threading.Thread(target=self._watch, args=(offer, check_in, check_out, stop, violations))
+        monitor.start()
+        started = time.perf_counter()
+        try:
+            # spawn, not fork: each worker sets Django up afresh and opens its own connection
+            with ProcessPoolExecutor(
+                max_workers=options["workers"], mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            ) as pool:
+                results = list(pool.map(_run_cycle, tasks))
+            elapsed = time.perf_counter() - started
+        finally:
+            stop.set()
+            monitor.join()
+
+        try:
+            self._report(results, elapsed, engine)
+            violations += self._verify(offer, check_in, check_out)
+        finally:
+            if not options["keep"]:
+                self._cleanup(world)
+        if violations:
+            for v in violations[:20]:
+                self.stderr.write(v)
+            raise CommandError(f"{len(violations)} inventory invariant violation(s)")
+        self.stdout.write(self.style.SUCCESS("No oversell; inventory counters match bookings"))
+
+    def _seed(self, options) -> dict:
+        tag = uuid.uuid4().hex[:8]
+        today = timezone.localdate()
+        check_in = today + timedelta(days=7)
+        check_out = check_in + timedelta(days=options["nights"])
+        with transaction.atomic():
+            owner = User.objects.create(username=f"stress-{tag}-owner")
+            UserProfile.objects.create(user=owner, role=Role.OWNER)
+            product = VoucherProduct.objects.create(
+                sku=f"STRESS-{tag}", name=f"Stress {tag}", city="Stress", payout_cap_kobo=10_000_000,
+                nights=options["nights"],
+            )
+            prop = Property.objects.create(
+                owner=owner, name=f"Stress {tag}", city="Stress", quality_score=50,
+                approval_status=PropertyApprovalStatus.APPROVED,
+            )
+            offer = OwnerOffer.objects.create(
+                property=prop, room_type="hot", start_date=today, end_date=check_out + timedelta(days=30),
+                units_per_day=options["capacity"], private_rate_kobo=10_000, eligible_skus=[product.sku],
+                auto_confirm=options["auto_confirm"], max_stay_nights=options["nights"],
+            )
+            customers = User.objects.bulk_create(
+                [User(username=f"stress-{tag}-{i}") for i in range(options["customers"])]
+            )
+            UserProfile.objects.bulk_create([UserProfile(user=c, role=Role.CUSTOMER) for c in customers])
+            vouchers = Voucher.objects.bulk_create(
+                [
+                    Voucher(
+                        voucher_product=product, user=c, code=f"ST-{tag}-{i}", status=VoucherStatus.ACTIVE,
+                        valid_until=timezone.now() + timedelta(days=60), nights_included=options["nights"],
+                    )
+                    for i, c in enumerate(customers)
+                ]
+            )
+        return {
+            "owner": owner, "product": product, "property": prop, "offer": offer,
+            "customers": customers, "vouchers": [(v.user_id, v.id) for v in vouchers],
+            "check_in": check_in, "check_out": check_out,
+        }
+
+    def _watch(self, offer, check_in, check_out, stop, violations):
+        """Poll committed counters while workers run, so a transient oversell is caught too."""
+        try:
+            while not stop.wait(0.05):
+                for d, (capacity, reserved, booked) in inventory_snapshot(offer, check_in, check_out).items():
+                    if reserved + booked > capacity:
+                        violations.append(f"{d}: reserved {reserved} + booked {booked} > capacity {capacity}")
+        finally:
+            connections.close_all()
+
+    def _verify(self, offer, check_in, check_out) -> list[str]:
+        problems = []
+        bookings = list(
+            Booking.objects.filter(offer=offer).values_list("status", "check_in", "check_out", "reserved_units")
+        )
+        for d, (capacity, reserved, booked) in sorted(inventory_snapshot(offer, check_in, check_out).items()):
+            want_reserved = sum(u for s, ci, co, u in bookings if s == BookingStatus.PENDING and ci <= d < co)
+            want_booked = sum(
+                u for s, ci, co, u in bookings
+                if s in (BookingStatus.CONFIRMED, BookingStatus.COMPLETED) and ci <= d < co
+            )
+            if reserved + booked > capacity:
+                problems.append(f"{d}: reserved {reserved} + booked {booked} > capacity {capacity}")
+            if (reserved, booked) != (want_reserved, want_booked):
+                problems.append(
+                    f"{d}: counters reserved={reserved} booked={booked}, "
+                    f"bookings say reserved={want_reserved} booked={want_booked}"
+                )
+        return problems
+
+    def _report(self, results, elapsed, engine):
+        outcomes = Counter()
+        by_op: dict[str, list[float]] = {}
+        lock_seconds = []
+        for r in results:
+            outcomes.update(r["outcomes"])
+            lock_seconds.append(r["lock_seconds"])
+            for op, seconds in r["timings"]:
+                by_op.setdefault(op, []).append(seconds)
+
+        requests = sum(len(v) for v in by_op.values())
+        self.stdout.write(
+            f"storage={settings.INVENTORY_STORAGE} engine={engine} customers={len(results)} "
+            f"requests={requests} elapsed={elapsed:.2f}s throughput={requests / elapsed:.1f} req/s"
+        )
+        for op, timings in sorted(by_op.items()):
+            timings.sort()
+            self.stdout.write(
+                f"  {op:8} n={len(timings)} p50={_pct(timings, 0.5):.1f}ms p99={_pct(timings, 0.99):.1f}ms"
+            )
+        lock_seconds.sort()
+        self.stdout.write(
+            f"  locking statements: total={sum(lock_seconds):.2f}s "
+            f"p50/cycle={_pct(lock_seconds, 0.5):.1f}ms p99/cycle={_pct(lock_seconds, 0.99):.1f}ms"
+        )
+        for outcome, n in sorted(outcomes.items()):
+            self.stdout.write(f"  {outcome}: {n}")
+
+    def _cleanup(self, world):
+        with transaction.atomic():
+            booking_ids = [str(i) for i in Booking.objects.filter(offer=world["offer"]).values_list("id", flat=True)]
+            AuditLog.objects.filter(entity_type="booking", entity_id__in=booking_ids).delete()
+            OutboxEvent.objects.filter(topic="audit", payload__entity_id__in=booking_ids).delete()
+            Booking.objects.filter(offer=world["offer"]).delete()
+            Voucher.objects.filter(voucher_product=world["product"]).delete()
+            world["offer"].delete()
+            world["property"].delete()
+            world["product"].delete()
+            User.objects.filter(id__in=[c.id for c in world["customers"]] + [world["owner"].id]).delete()
+
+
+def _pct(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))] * 1000
@@ -1,5 +1,7 @@
 from __future__ import annotations
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 import uuid
@@ -100,6 +102,7 @@ class VoucherProduct(models.Model):
     sell_price_kobo = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=["city", "is_active"])]
@@ -108,6 +111,22 @@ class VoucherProduct(models.Model):
         return self.sku
 
 
+class OfferSkuEligibility(models.Model):
+    """
+    Materialized SKU<->offer link. A row exists when the offer lists the SKU in
+    eligible_skus and its property passes the product's city/score/tier gates.
+    Maintained by core.signals; see core.services.eligibility_index.
+    """
+    id = models.BigAutoField(primary_key=True)
+    voucher_product = models.ForeignKey(VoucherProduct, on_delete=models.CASCADE, related_name="offer_index")
+    offer = models.ForeignKey(OwnerOffer, on_delete=models.CASCADE, related_name="sku_index")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [("voucher_product", "offer")]
+
+
 class VoucherStatus(models.TextChoices):
     CREATED = "created", "Created"
     ACTIVE = "active", "Active"
@@ -116,6 +135,27 @@ class VoucherStatus(models.TextChoices):
     EXPIRED = "expired", "Expired"
 
 
+class VoucherOrder(models.Model):
+    """Bulk purchase of `quantity` vouchers of one product, paid with a single Payment."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="voucher_orders")
+    voucher_product = models.ForeignKey(VoucherProduct, on_delete=models.PROTECT, related_name="orders")
+    quantity = models.PositiveIntegerField()
+    unit_price_kobo = models.PositiveIntegerField()
+    idempotency_key = models.CharField(max_length=255, blank=True, default="")  # client Idempotency-Key, if sent
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "idempotency_key"],
+                condition=~models.Q(idempotency_key=""),
+                name="voucher_order_idempotency_key",
+            ),
+        ]
+
+
 class Voucher(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     voucher_product = models.ForeignKey(VoucherProduct, on_delete=models.PROTECT, related_name="vouchers")
@@ -127,6 +167,7 @@ class Voucher(models.Model):
     nights_included = models.PositiveIntegerField(default=1)
     sell_price_kobo = models.PositiveIntegerField(default=0)
     policy_snapshot = models.JSONField(default=dict, blank=True)  # MVP: frozen copy of key rules
+    order = models.ForeignKey(VoucherOrder, on_delete=models.PROTECT, null=True, blank=True, related_name="vouchers")
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -137,6 +178,23 @@ class Voucher(models.Model):
         ]
 
 
+class VoucherCode(models.Model):
+    """
+    Registry of every voucher code ever generated; unclaimed rows form the pool that
+    core.services.codes hands out. Claimed rows stay, so a regenerated code can never
+    be issued twice.
+    """
+    code = models.CharField(max_length=32, primary_key=True)
+    prefix = models.CharField(max_length=8)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["prefix"], name="voucher_code_pool_idx", condition=models.Q(claimed_at__isnull=True)),
+        ]
+
+
 class BookingStatus(models.TextChoices):
     PENDING = "pending", "Pending"
     CONFIRMED = "confirmed", "Confirmed"
@@ -167,6 +225,9 @@ class Booking(models.Model):
             models.Index(fields=["property", "status"]),
             models.Index(fields=["offer", "status"]),
             models.Index(fields=["user", "status"]),
+            models.Index(fields=["status", "confirm_by"]),
+            # OwnerBookings: property__owner filter, keyset on (created_at, id)
+            models.Index(fields=["property", "-created_at", "-id"], name="booking_property_recent_idx"),
         ]
 
 
@@ -185,6 +246,22 @@ class OfferInventoryDay(models.Model):
         ]
 
 
+class OfferInventoryMonth(models.Model):
+    """
+    Compact alternative to OfferInventoryDay (INVENTORY_STORAGE="monthly"): one row per
+    offer per calendar month, element i of each array being day i + 1 of the month.
+    """
+    id = models.BigAutoField(primary_key=True)
+    offer = models.ForeignKey(OwnerOffer, on_delete=models.CASCADE, related_name="inventory_months")
+    month = models.DateField()  # first day of the month
+    capacity = ArrayField(models.IntegerField())
+    reserved = ArrayField(models.IntegerField())
+    booked = ArrayField(models.IntegerField())
+
+    class Meta:
+        unique_together = [("offer", "month")]
+
+
 class OTPPurpose(models.TextChoices):
     BOOKING_REDEEM = "booking_redeem", "Booking Redeem"
 
@@ -213,10 +290,12 @@ class PaymentStatus(models.TextChoices):
 
 class Payment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    voucher = models.ForeignKey(Voucher, on_delete=models.PROTECT, related_name="payments")
+    # Exactly one of voucher (single purchase) and order (bulk purchase) is set
+    voucher = models.ForeignKey(Voucher, on_delete=models.PROTECT, null=True, blank=True, related_name="payments")
+    order = models.ForeignKey(VoucherOrder, on_delete=models.PROTECT, null=True, blank=True, related_name="payments")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="payments")
     reference = models.CharField(max_length=64, unique=True)
-    amount_kobo = models.PositiveIntegerField()
+    amount_kobo = models.PositiveBigIntegerField()
     currency = models.CharField(max_length=8, default="NGN")
     status = models.CharField(max_length=16, choices=PaymentStatus.choices, default=PaymentStatus.PENDING)
     gateway = models.CharField(max_length=24, default="paystack")
@@ -225,6 +304,13 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="payment_pending_idx", condition=models.Q(status="pending")
+            ),
+        ]
+
 
 class PayoutStatus(models.TextChoices):
     PENDING = "pending", "Pending"
@@ -252,7 +338,7 @@ class AuditLog(models.Model):
     entity_type = models.CharField(max_length=64)
     entity_id = models.CharField(max_length=64)
     meta_data = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)  # set from the outbox event when drained
 
 
 class MessageChannel(models.TextChoices):
@@ -262,6 +348,7 @@ class MessageChannel(models.TextChoices):
 
 class MessageStatus(models.TextChoices):
     QUEUED = "queued", "Queued"
+    SENDING = "sending", "Sending"
     SENT = "sent", "Sent"
     DELIVERED = "delivered", "Delivered"
     FAILED = "failed", "Failed"
@@ -280,6 +367,67 @@ class OutboundMessage(models.Model):
     error_code = models.CharField(max_length=64, blank=True, default="")
     error_message = models.TextField(blank=True, default="")
     payload = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)  # lease while SENDING
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header; status_code is null while in flight."""
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys")
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField()
+    expires_at = models.DateTimeField()
 
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [("user", "scope", "key")]
+        indexes = [models.Index(fields=["expires_at"])]
+
+
+def _new_dedupe_key() -> str:
+    return uuid.uuid4().hex
+
+
+class OutboxEvent(models.Model):
+    """Side effect recorded inside a business transaction and delivered after commit by drain_outbox."""
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    dedupe_key = models.CharField(max_length=128, unique=True, default=_new_dedupe_key)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    dead_at = models.DateTimeField(null=True, blank=True)  # dead-lettered after OUTBOX_MAX_ATTEMPTS
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["available_at", "id"],
+                name="outbox_pending_idx",
+                condition=models.Q(processed_at__isnull=True, dead_at__isnull=True),
+            ),
+            models.Index(fields=["processed_at"]),
+        ]
+
+
+class JobCheckpoint(models.Model):
+    """Resume point of a long-running batch job (e.g. reconcile_payments), keyed by job name."""
+    name = models.CharField(max_length=64, primary_key=True)
+    cursor = models.TextField(blank=True, default="")  # core.services.cursors token; empty = start over
     updated_at = models.DateTimeField(auto_now=True)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
-from core.models import VoucherProduct, Voucher, Booking, Payment, Payout
+from core.models import VoucherProduct, Voucher, Booking, BookingStatus, Payment, Payout
 
 
 class VoucherProductSerializer(serializers.ModelSerializer):
@@ -27,9 +28,23 @@ class PurchaseVoucherSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
 
+class VoucherOrderSerializer(serializers.Serializer):
+    sku = serializers.CharField()
+    email = serializers.EmailField()
+    quantity = serializers.IntegerField(min_value=1)
+    output = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+
+    def validate_quantity(self, value):
+        if value > settings.BULK_VOUCHER_MAX_QUANTITY:
+            raise serializers.ValidationError(f"At most {settings.BULK_VOUCHER_MAX_QUANTITY} vouchers per order")
+        return value
+
+
 class EligibilityRequestSerializer(serializers.Serializer):
     check_in = serializers.DateField()
     check_out = serializers.DateField()
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=30)
+    cursor = serializers.CharField(required=False, allow_blank=True, default="")
 
 
 class EligibleOfferSerializer(serializers.Serializer):
@@ -42,164 +57,160 @@ class EligibleOfferSerializer(serializers.Serializer):
     effective_score = serializers.IntegerField()
 
 
-class CreateBookingSerializer(serializers.Serializer):
-    voucher_id = serializers.UUIDField()
-    offer_id = serializers.UUIDField()
+class BatchEligibilityRequestSerializer(serializers.Serializer):
     check_in = serializers.DateField()
     check_out = serializers.DateField()
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=30)
 
 
-class BookingSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Booking
-        fields = ["id", "voucher_id", "offer_id", "property_id", "status", "check_in", "check_out", "confirmation_required", "confirm_by"]
-
-
-class VerifyOTPSerializer(serializers.Serializer):
-    otp_code = serializers.CharField(min_length=4, max_length=10)
-
-
-class RequestOTPSuccessSerializer(serializers.Serializer):
-    otp_expires_at = serializers.DateTimeField()
-    delivered_via = serializers.CharField()
-
-
-class PaymentVerifySerializer(serializers.Serializer):
-    reference = serializers.CharField()
+class VoucherEligibilityResultSerializer(serializers.Serializer):
+    voucher_id = serializers.UUIDField()
+    voucher_code = serializers.CharField()
+    sku = serializers.CharField()
+    detail = serializers.CharField(allow_blank=True)
+    offers = EligibleOfferSerializer(many=True)
 
 
-class PayoutSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Payout
-        fields = ["id", "booking_id", "owner_id", "amount_kobo", "status", "approved_at", "paid_at", "payment_reference"]
-", "name", "description", "city",
-            "sell_price_kobo", "is_active", "sell_enabled",
-            "eligible_properties_count", "current_policy",
-            "created_at",
-        ]
+class AvailabilityCalendarRequestSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    days = serializers.IntegerField(min_value=1, max_value=120, default=60)
 
 
-class VoucherSerializer(serializers.ModelSerializer):
-    product_name = serializers.CharField(source="voucher_product.name", read_only=True)
-    
-    class Meta:
-        model = Voucher
-        fields = [
-            "id", "code", "product_name", "status",
-            "sell_price_kobo", "valid_from", "valid_until",
-            "nights_included", "activated_at", "created_at",
-        ]
+class AvailabilityDaySerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    available = serializers.BooleanField()
+    offer_count = serializers.IntegerField()
+
+
+MAX_INVENTORY_EDIT_NIGHTS = 731
+
+
+class InventoryRangeEditSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField(help_text="Exclusive, like check_out")
+    capacity = serializers.IntegerField(min_value=0, required=False, allow_null=True, default=None)
+    stop_sell = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs["end"] <= attrs["start"]:
+            raise serializers.ValidationError("end must be after start")
+        if (attrs["capacity"] is None) == (not attrs["stop_sell"]):
+            raise serializers.ValidationError("Give either capacity or stop_sell")
+        return attrs
+
+
+class InventoryDayEditSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    capacity = serializers.IntegerField(min_value=0, required=False, allow_null=True, default=None)
+    stop_sell = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if (attrs["capacity"] is None) == (not attrs["stop_sell"]):
+            raise serializers.ValidationError("Give either capacity or stop_sell")
+        return attrs
+
+
+class BulkInventoryEditSerializer(serializers.Serializer):
+    """
+    Ranges first, then single days; a later entry for the same night wins. Validated data
+    gains `changes`: date -> new capacity, or None for stop-sell (capacity = reserved + booked).
+    """
+    ranges = InventoryRangeEditSerializer(many=True, required=False, default=list)
+    days = InventoryDayEditSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        from core.services.timeutils import daterange
+        changes = {}
+        for r in attrs["ranges"]:
+            if len(changes) + (r["end"] - r["start"]).days > MAX_INVENTORY_EDIT_NIGHTS:
+                raise serializers.ValidationError(f"At most {MAX_INVENTORY_EDIT_NIGHTS} nights per request")
+            for d in daterange(r["start"], r["end"]):
+                changes[d] = None if r["stop_sell"] else r["capacity"]
+        for day in attrs["days"]:
+            changes[day["date"]] = None if day["stop_sell"] else day["capacity"]
+        if not changes:
+            raise serializers.ValidationError("Nothing to change")
+        if len(changes) > MAX_INVENTORY_EDIT_NIGHTS:
+            raise serializers.ValidationError(f"At most {MAX_INVENTORY_EDIT_NIGHTS} nights per request")
+        attrs["changes"] = changes
+        return attrs
+
+
+class InventoryConflictSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    requested_capacity = serializers.IntegerField()
+    reserved = serializers.IntegerField()
+    booked = serializers.IntegerField()
 
 
-class PaymentSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Payment
-        fields = [
-            "id", "reference", "amount_kobo", "currency",
-            "status", "paid_at", "created_at",
-        ]
+class CreateBookingSerializer(serializers.Serializer):
+    voucher_id = serializers.UUIDField()
+    offer_id = serializers.UUIDField()
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
 
 
 class BookingSerializer(serializers.ModelSerializer):
-    property_name = serializers.CharField(source="property.name", read_only=True)
-    voucher_code = serializers.CharField(source="voucher.code", read_only=True)
-    
     class Meta:
         model = Booking
-        fields = [
-            "id", "voucher_code", "property_name",
-            "status", "check_in", "check_out", "nights",
-            "confirmation_required", "confirmed_at",
-            "completed_at", "created_at",
-        ]
-
-
-class BookingDetailSerializer(BookingSerializer):
-    offer_details = OwnerOfferSerializer(source="offer", read_only=True)
-    
-    class Meta(BookingSerializer.Meta):
-        fields = BookingSerializer.Meta.fields + ["offer_details"]
-
-
-class PayoutSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Payout
-        fields = [
-            "id", "amount_kobo", "status",
-            "approved_at", "paid_at", "payment_reference",
-            "created_at",
-        ]
+        fields = ["id", "voucher_id", "offer_id", "property_id", "status", "check_in", "check_out", "confirmation_required", "confirm_by"]
 
 
-class OTPVerificationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = OTPVerification
-        fields = ["id", "phone_number", "purpose", "is_verified", "created_at"]
+class OwnerBookingsQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=BookingStatus.choices, required=False)
+    property_id = serializers.UUIDField(required=False)
+    check_in_from = serializers.DateField(required=False)
+    check_in_to = serializers.DateField(required=False, help_text="Inclusive")
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=50)
+    cursor = serializers.CharField(required=False, allow_blank=True, default="")
 
+    def validate(self, attrs):
+        if "check_in_from" in attrs and "check_in_to" in attrs and attrs["check_in_to"] < attrs["check_in_from"]:
+            raise serializers.ValidationError("check_in_to must not be before check_in_from")
+        return attrs
 
-class AuditLogSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = AuditLog
-        fields = ["id", "action_type", "entity_type", "entity_id", 
-                  "description", "created_at"]
 
+MAX_BULK_BOOKING_ACTIONS = 300
 
-# Request/Response serializers for specific endpoints
 
-class VoucherPurchaseRequestSerializer(serializers.Serializer):
-    voucher_product_sku = serializers.CharField()
-    email = serializers.EmailField()
-    phone = serializers.CharField(required=False)
+class BookingActionSerializer(serializers.Serializer):
+    booking_id = serializers.UUIDField()
+    action = serializers.ChoiceField(choices=["confirm", "decline"])
 
 
-class PaymentInitializeResponseSerializer(serializers.Serializer):
-    voucher_id = serializers.UUIDField()
-    payment_reference = serializers.CharField()
-    authorization_url = serializers.CharField()
-
+class BulkBookingActionSerializer(serializers.Serializer):
+    actions = BookingActionSerializer(many=True, allow_empty=False, max_length=MAX_BULK_BOOKING_ACTIONS)
 
-class EligibilityRequestSerializer(serializers.Serializer):
-    voucher_id = serializers.UUIDField()
-    check_in = serializers.DateField()
-    check_out = serializers.DateField()
-    area = serializers.CharField(required=False, allow_blank=True)
+    def validate_actions(self, value):
+        ids = [a["booking_id"] for a in value]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each booking may appear only once")
+        return value
 
 
-class EligibleOfferSerializer(serializers.Serializer):
-    offer_id = serializers.UUIDField()
-    property_id = serializers.UUIDField()
-    property_name = serializers.CharField()
-    is_eligible = serializers.BooleanField()
-    reason = serializers.CharField()
-    effective_score = serializers.FloatField()
-    auto_confirm = serializers.BooleanField()
-    private_rate_kobo = serializers.IntegerField()
-    payout_required_kobo = serializers.IntegerField()
-    within_cap = serializers.BooleanField()
-    availability_confidence = serializers.CharField()
-    room_type = serializers.CharField()
-    city = serializers.CharField()
-    area = serializers.CharField()
-    tier = serializers.CharField()
-    quality_score = serializers.FloatField()
+class BookingActionResultSerializer(serializers.Serializer):
+    booking_id = serializers.UUIDField()
+    action = serializers.CharField()
+    outcome = serializers.CharField()
+    detail = serializers.CharField(required=False)
 
 
-class CreateBookingRequestSerializer(serializers.Serializer):
-    voucher_id = serializers.UUIDField()
-    offer_id = serializers.UUIDField()
-    check_in = serializers.DateField()
-    check_out = serializers.DateField()
+class VerifyOTPSerializer(serializers.Serializer):
+    otp_code = serializers.CharField(min_length=4, max_length=10)
 
 
-class OwnerConfirmBookingSerializer(serializers.Serializer):
-    confirm = serializers.BooleanField()
-    reason = serializers.CharField(required=False, allow_blank=True)
+class RequestOTPSuccessSerializer(serializers.Serializer):
+    otp_expires_at = serializers.DateTimeField()
+    delivered_via = serializers.CharField()  # "queued": sent asynchronously by dispatch_messages
+    message_id = serializers.UUIDField()
 
 
-class OTPVerifySerializer(serializers.Serializer):
-    otp_code = serializers.CharField(max_length=10)
+class PaymentVerifySerializer(serializers.Serializer):
+    reference = serializers.CharField()
 
 
-class WebhookPayloadSerializer(serializers.Serializer):
-    event = serializers.CharField()
-    data = serializers.DictField()
+class PayoutSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payout
+        fields = ["id", "booking_id", "owner_id", "amount_kobo", "status", "approved_at", "paid_at", "payment_reference"]
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import csv
+import json
+import secrets
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from core.models import Payment, PaymentStatus, Voucher, VoucherOrder, VoucherProduct, VoucherStatus
+from .codes import CLAIM_SQL, claim_voucher_codes
+from .payments import FAILED, apply_gateway_outcomes
+from .policy import policy_snapshot
+
+EXPORT_FIELDS = ["code", "voucher_id", "status", "valid_until"]
+EXPORT_CHUNK = 2000
+
+_VOUCHER_COLUMNS = (
+    "id, voucher_product_id, user_id, order_id, code, status, valid_from, valid_until, "
+    "nights_included, sell_price_kobo, policy_snapshot, created_at"
+)
+_VOUCHER_VALUES = (
+    "gen_random_uuid(), %(product_id)s, %(user_id)s, %(order_id)s, {code}, %(status)s, %(now)s, %(valid_until)s, "
+    "%(nights)s, %(price)s, %(policy)s::jsonb, %(now)s"
+)
+
+
+def _insert_vouchers(order: VoucherOrder, status: str, now) -> int:
+    """
+    Claim codes from the pool and insert the order's vouchers in one INSERT ... SELECT,
+    so neither codes nor Voucher objects pass through Python. If the pool is short,
+    the rest get freshly generated codes. Returns the number of vouchers created.
+    """
+    vp = order.voucher_product
+    params = {
+        "product_id": vp.pk,
+        "user_id": order.user_id,
+        "order_id": order.pk,
+        "status": status,
+        "now": now,
+        "valid_until": now + timedelta(days=vp.validity_days),
+        "nights": vp.nights,
+        "price": order.unit_price_kobo,
+        "policy": json.dumps(policy_snapshot(vp)),
+        "n": order.quantity,
+        "prefix": "SV",
+    }
+    pool_sql = f"""
+        WITH claimed AS ({CLAIM_SQL})
+        INSERT INTO {Voucher._meta.db_table} ({_VOUCHER_COLUMNS})
+        SELECT {_VOUCHER_VALUES.format(code="claimed.code")} FROM claimed
+    """
+    with connection.cursor() as cur:
+        cur.execute(pool_sql, params)
+        created = cur.rowcount
+        if created < order.quantity:
+            codes = claim_voucher_codes(order.quantity - created, params["prefix"])
+            cur.execute(
+                f"INSERT INTO {Voucher._meta.db_table} ({_VOUCHER_COLUMNS}) "
+                f"SELECT {_VOUCHER_VALUES.format(code='c')} FROM unnest(%(codes)s::varchar[]) AS c",
+                {**params, "codes": codes},
+            )
+            created += cur.rowcount
+    return created
+
+
+@transaction.atomic
+def create_voucher_order(
+    *, user, voucher_product: VoucherProduct, quantity: int, paid_offline: bool = False, idempotency_key: str = ""
+) -> tuple[VoucherOrder, Payment]:
+    """
+    Create an order of `quantity` vouchers with one Payment for the total. Vouchers
+    start CREATED and are activated by the payment (webhook / verify / reconcile);
+    paid_offline (invoiced partner orders) records a successful manual payment and
+    issues them ACTIVE. A repeated (user, idempotency_key) raises IntegrityError.
+    """
+    now = timezone.now()
+    order = VoucherOrder.objects.create(
+        user=user, voucher_product=voucher_product, quantity=quantity, unit_price_kobo=voucher_product.sell_price_kobo,
+        idempotency_key=idempotency_key,
+    )
+    payment = Payment.objects.create(
+        order=order,
+        user=user,
+        reference=f"svo_{secrets.token_hex(8)}",
+        amount_kobo=quantity * order.unit_price_kobo,
+        status=PaymentStatus.SUCCESSFUL if paid_offline else PaymentStatus.PENDING,
+        gateway="manual" if paid_offline else "paystack",
+    )
+    _insert_vouchers(order, VoucherStatus.ACTIVE if paid_offline else VoucherStatus.CREATED, now)
+    return order, payment
+
+
+@transaction.atomic
+def fail_unpaid_order(order: VoucherOrder, payment: Payment, error: str):
+    """
+    The gateway transaction could not be created: fail the payment, expire the order's
+    vouchers and release its idempotency key so the client can retry with it.
+    """
+    apply_gateway_outcomes({payment.reference: (FAILED, {"initialize_error": error})})
+    VoucherOrder.objects.filter(pk=order.pk).update(idempotency_key="")
+
+
+def _order_rows(order: VoucherOrder):
+    return (
+        Voucher.objects.filter(order=order)
+        .order_by("code")
+        .values_list("code", "id", "status", "valid_until")
+        .iterator(chunk_size=EXPORT_CHUNK)
+    )
+
+
+def _chunked(lines):
+    """Join lines into ~EXPORT_CHUNK-row pieces so large exports are not written row by row."""
+    buf = []
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= EXPORT_CHUNK:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_order_csv(order: VoucherOrder):
+    """Yield the order's vouchers as CSV, read through a server-side cursor."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    yield from _chunked(
+        writer.writerow([code, voucher_id, status, valid_until.isoformat()])
+        for code, voucher_id, status, valid_until in _order_rows(order)
+    )
+
+
+def stream_order_ndjson(order: VoucherOrder):
+    yield from _chunked(
+        json.dumps(dict(zip(EXPORT_FIELDS, [code, str(voucher_id), status, valid_until.isoformat()]))) + "\n"
+        for code, voucher_id, status, valid_until in _order_rows(order)
+    )
+
+
+EXPORTERS = {
+    "csv": (stream_order_csv, "text/csv"),
+    "ndjson": (stream_order_ndjson, "application/x-ndjson"),
+}
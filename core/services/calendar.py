@@ -0,0 +1,96 @@
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from django.conf import settings
+from django.utils import timezone
+from core.models import OfferInventoryDay
+from .eligibility import base_offer_queryset
+from .inventory_monthly import iter_free_capacity
+from .policy import get_policy
+
+
+def availability_calendar(voucher, start: date, days: int, *, units: int = 1) -> list[dict]:
+    """
+    For each check-in in [start, start + days), how many eligible offers can take
+    `units` for the voucher's full stay. Two queries in total: the candidate offers
+    and the offer x night inventory matrix; everything else is array arithmetic.
+    """
+    vp = voucher.voucher_product
+    policy = get_policy(vp)
+    nights = voucher.nights_included
+    check_ins = [start + timedelta(days=i) for i in range(days)]
+    horizon = days + nights - 1  # nights covered by any stay in the window
+    first_ord = start.toordinal()
+
+    # Hours from now to each check-in midnight (same rule as policy.hours_until)
+    now = timezone.now()
+    tz = timezone.get_current_timezone()
+    hours = np.array(
+        [(datetime.combine(d, datetime.min.time(), tzinfo=tz) - now).total_seconds() // 3600 for d in check_ins]
+    )
+
+    # Voucher-level masks over the check-in axis
+    night_ords = np.arange(first_ord, first_ord + horizon)
+    shift = night_ords - policy.blackout_base
+    blackout = np.array(
+        [bool(policy.blackout_bits >> int(s) & 1) if s >= 0 else False for s in shift], dtype=bool
+    )
+    stay_blackout = sliding_window_view(blackout, nights).any(axis=1)
+    weekdays = (night_ords[:days] + 6) % 7  # date.toordinal() 1 == Monday
+    allowed = (policy.allowed_days_mask >> weekdays) & 1 == 1
+    voucher_ok = ~stay_blackout & allowed & (hours >= policy.lead_time_hours)
+
+    counts = np.zeros(days, dtype=int)
+    offers = []
+    if voucher_ok.any():
+        offers = list(
+            base_offer_queryset(vp, nights)
+            .filter(start_date__lte=check_ins[-1], end_date__gte=start + timedelta(days=nights))
+            .values_list("id", "start_date", "end_date", "units_per_day", "min_lead_time_hours")
+        )
+    if offers:
+        counts = _offer_counts(offers, start, days, nights, units, hours) * voucher_ok
+
+    return [
+        {
+            "check_in": d,
+            "check_out": d + timedelta(days=nights),
+            "available": bool(counts[i]),
+            "offer_count": int(counts[i]),
+        }
+        for i, d in enumerate(check_ins)
+    ]
+
+
+def _offer_counts(offers, start: date, days: int, nights: int, units: int, hours) -> np.ndarray:
+    horizon = days + nights - 1
+    first_ord = start.toordinal()
+
+    row_of = {o[0]: i for i, o in enumerate(offers)}
+    starts = np.array([o[1].toordinal() for o in offers])
+    ends = np.array([o[2].toordinal() for o in offers])
+    units_per_day = np.array([o[3] for o in offers])
+    min_lead = np.array([o[4] for o in offers])
+
+    # offer x night free capacity; unseeded nights fall back to units_per_day
+    free = np.repeat(units_per_day[:, None], horizon, axis=1)
+    for offer_id, d, available in _free_capacity(list(row_of), start, start + timedelta(days=horizon)):
+        free[row_of[offer_id], d.toordinal() - first_ord] = available
+
+    stay_min = sliding_window_view(free, nights, axis=1).min(axis=2)  # offers x check-ins
+    check_in_ords = np.arange(first_ord, first_ord + days)
+    in_range = (starts[:, None] <= check_in_ords[None, :]) & (check_in_ords[None, :] + nights <= ends[:, None])
+    lead_ok = hours[None, :] >= min_lead[:, None]
+    return ((stay_min >= units) & in_range & lead_ok).sum(axis=0)
+
+
+def _free_capacity(offer_ids, start: date, end: date):
+    if settings.INVENTORY_STORAGE == "monthly":
+        return iter_free_capacity(offer_ids, start, end)
+    return (
+        (offer_id, d, capacity - reserved - booked)
+        for offer_id, d, capacity, reserved, booked in OfferInventoryDay.objects.filter(
+            offer_id__in=offer_ids, date__gte=start, date__lt=end
+        ).values_list("offer_id", "date", "capacity", "reserved", "booked")
+    )
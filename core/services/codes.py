@@ -1,6 +1,15 @@
+from __future__ import annotations
+import logging
 import secrets
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from core.models import Voucher, VoucherCode
+
+logger = logging.getLogger(__name__)
 
 ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"  # no 0/1/I/O
+REFILL_CHUNK = 5000
 
 
 def generate_voucher_code(prefix: str = "SV") -> str:
@@ -11,3 +20,85 @@ def generate_voucher_code(prefix: str = "SV") -> str:
 def generate_otp_code() -> str:
     # 6-digit numeric
     return f"{secrets.randbelow(1_000_000):06d}"
+
+
+def _register(codes: list[str], prefix: str, claimed: bool) -> list[str]:
+    """
+    Insert codes into the registry, skipping any already registered or already on a
+    voucher (codes issued before the registry existed). Returns the codes inserted.
+    """
+    sql = f"""
+        INSERT INTO {VoucherCode._meta.db_table} (code, prefix, claimed_at, created_at)
+        SELECT c, %(prefix)s, %(claimed_at)s, %(now)s
+        FROM unnest(%(codes)s::varchar[]) AS c
+        WHERE NOT EXISTS (SELECT 1 FROM {Voucher._meta.db_table} v WHERE v.code = c)
+        ON CONFLICT (code) DO NOTHING
+        RETURNING code
+    """
+    now = timezone.now()
+    params = {"codes": codes, "prefix": prefix, "claimed_at": now if claimed else None, "now": now}
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return [row[0] for row in cur.fetchall()]
+
+
+# Claims %(n)s pool codes of %(prefix)s; also usable as a CTE (see bulk_vouchers)
+CLAIM_SQL = f"""
+    UPDATE {VoucherCode._meta.db_table} SET claimed_at = %(now)s
+    WHERE code IN (
+        SELECT code FROM {VoucherCode._meta.db_table}
+        WHERE prefix = %(prefix)s AND claimed_at IS NULL
+        LIMIT %(n)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING code
+"""
+
+
+def claim_voucher_codes(n: int, prefix: str = "SV") -> list[str]:
+    """
+    Take n unused codes from the pool in one statement (FOR UPDATE SKIP LOCKED, so
+    concurrent purchases never wait on each other). The claim is part of the caller's
+    transaction: if that rolls back, the codes go back to the pool. A pool that runs dry
+    is topped up inline with freshly registered codes.
+    """
+    with connection.cursor() as cur:
+        cur.execute(CLAIM_SQL, {"now": timezone.now(), "prefix": prefix, "n": n})
+        codes = [row[0] for row in cur.fetchall()]
+    if len(codes) < n:
+        logger.warning("Voucher code pool %s ran dry (%d of %d claimed); generating inline", prefix, len(codes), n)
+    while len(codes) < n:
+        codes += _register([generate_voucher_code(prefix) for _ in range(n - len(codes))], prefix, claimed=True)
+    return codes
+
+
+def claim_voucher_code(prefix: str = "SV") -> str:
+    return claim_voucher_codes(1, prefix)[0]
+
+
+def available_codes(prefix: str = "SV") -> int:
+    return VoucherCode.objects.filter(prefix=prefix, claimed_at__isnull=True).count()
+
+
+def refill_voucher_code_pool(prefix: str = "SV", *, target: int | None = None) -> int:
+    """Top the pool up to `target` unclaimed codes (default VOUCHER_CODE_POOL_SIZE); returns codes added."""
+    target = target or settings.VOUCHER_CODE_POOL_SIZE
+    added = 0
+    missing = target - available_codes(prefix)
+    while missing > 0:
+        batch = min(missing, REFILL_CHUNK)
+        inserted = len(_register([generate_voucher_code(prefix) for _ in range(batch)], prefix, claimed=False))
+        added += inserted
+        missing -= inserted
+    return added
+
+
+def code_pool_stats(prefix: str = "SV") -> dict:
+    available = available_codes(prefix)
+    return {
+        "prefix": prefix,
+        "available": available,
+        "target": settings.VOUCHER_CODE_POOL_SIZE,
+        "low_water": settings.VOUCHER_CODE_POOL_LOW_WATER,
+        "below_low_water": available < settings.VOUCHER_CODE_POOL_LOW_WATER,
+    }
@@ -0,0 +1,20 @@
+from __future__ import annotations
+import base64
+import json
+
+
+def encode_cursor(*values) -> str:
+    """Opaque keyset cursor for the sort key of the last row on a page."""
+    raw = json.dumps(list(values), default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, arity: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != arity:
+        raise ValueError("Invalid cursor")
+    return values
@@ -1,17 +1,18 @@
 from __future__ import annotations
-from datetime import date, datetime, timedelta
+from dataclasses import dataclass
+from datetime import date
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from core.models import Voucher, OwnerOffer, Property
+from core.models import Voucher, OwnerOffer, OfferInventoryDay, OfferSkuEligibility
+from .policy import get_policy, hours_until
 
 
 class EligibilityError(Exception):
     pass
 
 
-def _weekday_name(d: date) -> str:
-    return ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][d.weekday()]
-
-
 def validate_voucher_active(voucher: Voucher):
     now = timezone.now()
     if voucher.status != "active":
@@ -29,78 +30,181 @@ def validate_dates(voucher: Voucher, check_in: date, check_out: date):
 
 
 def is_blackout(voucher_product, check_in: date, check_out: date) -> bool:
-    blackout = set(voucher_product.blackout_dates or [])
-    cur = check_in
-    while cur < check_out:
-        if cur.isoformat() in blackout:
-            return True
-        cur += timedelta(days=1)
-    return False
+    return get_policy(voucher_product).is_blackout(check_in, check_out)
 
 
 def allowed_days_ok(voucher_product, check_in: date) -> bool:
-    allowed = voucher_product.allowed_days or []
-    if not allowed:
-        return True
-    return _weekday_name(check_in) in allowed
+    return get_policy(voucher_product).allowed_day(check_in)
 
 
 def lead_time_ok(voucher_product, offer, check_in: date) -> bool:
-    now = timezone.now()
     min_hours = max(voucher_product.lead_time_hours, offer.min_lead_time_hours)
-    min_dt = now + timedelta(hours=min_hours)
-    return datetime.combine(check_in, datetime.min.time(), tzinfo=timezone.get_current_timezone()) >= min_dt
+    return hours_until(check_in) >= min_hours
 
 
 def payout_cap_ok(voucher_product, offer, nights: int) -> bool:
     return offer.private_rate_kobo * nights <= voucher_product.payout_cap_kobo
 
 
-def query_eligible_offers(voucher: Voucher, check_in: date, check_out: date):
+def base_offer_queryset(voucher_product, nights: int):
+    """Date-independent offer gates for a SKU and stay length."""
+    return OwnerOffer.objects.filter(
+        is_active=True,
+        property__is_active=True,
+        property__approval_status="approved",
+        # SKU membership plus city/tier/score gates are pre-evaluated in OfferSkuEligibility
+        sku_index__voucher_product=voucher_product,
+        max_stay_nights__gte=nights,
+        # Payout cap reduced to a rate threshold
+        private_rate_kobo__lte=get_policy(voucher_product).max_rate_kobo(nights),
+    )
+
+
+def availability_annotations(check_in: date, check_out: date, units: int) -> dict:
+    """
+    `short` (some night has capacity - reserved - booked < units) and `seeded_nights`
+    (stored nights in the stay) as correlated subqueries for OwnerOffer querysets,
+    over whichever inventory storage is configured.
+    """
+    if settings.INVENTORY_STORAGE == "monthly":
+        from .inventory_monthly import availability_annotations as monthly_annotations
+        return monthly_annotations(check_in, check_out, units)
+    stay = OfferInventoryDay.objects.filter(offer=OuterRef("pk"), date__gte=check_in, date__lt=check_out)
+    seeded = stay.order_by().values("offer").annotate(n=Count("id")).values("n")
+    return {
+        "short": Exists(stay.filter(capacity__lt=F("reserved") + F("booked") + units)),
+        "seeded_nights": Coalesce(Subquery(seeded), 0),
+    }
+
+
+def filter_available(qs, check_in: date, check_out: date, units: int):
+    """
+    Keep offers with capacity - reserved - booked >= units on every night of the stay.
+    Nights without stored inventory have nothing reserved yet, so they fall back to
+    units_per_day.
+    """
+    nights = (check_out - check_in).days
+    return (
+        qs.annotate(**availability_annotations(check_in, check_out, units))
+        .filter(short=False)
+        .filter(Q(seeded_nights=nights) | Q(units_per_day__gte=units))
+    )
+
+
+def eligible_offers_queryset(voucher: Voucher, check_in: date, check_out: date, *, units: int | None = None):
+    """
+    Eligible offers annotated with effective_score and ordered by
+    (effective_score desc, private_rate_kobo asc, id) in the database.
+    With units set, offers without that much free inventory on every night are dropped.
+    """
     vp = voucher.voucher_product
     nights = (check_out - check_in).days
+    if nights <= 0:
+        return OwnerOffer.objects.none()
+
+    # Voucher-level gates (blackout, allowed days, product lead time) do not depend
+    # on the offer: reject before touching the database.
+    now = timezone.now()
+    policy = get_policy(vp)
+    if policy.reject_reason(check_in, check_out, now) is not None:
+        return OwnerOffer.objects.none()
 
     qs = (
-        OwnerOffer.objects
+        base_offer_queryset(vp, nights)
         .select_related("property")
         .filter(
-            is_active=True,
-            property__is_active=True,
-            property__approval_status="approved",
-            property__city=vp.city,
             start_date__lte=check_in,
             end_date__gte=check_out,
+            min_lead_time_hours__lte=hours_until(check_in, now),
         )
     )
 
-    # MVP eligible_skus stored as JSON list
-    qs = qs.filter(eligible_skus__contains=[vp.sku])
+    if units is not None:
+        qs = filter_available(qs, check_in, check_out, units)
 
-    # Tier/score gates
-    qs = qs.filter(
-        property__quality_score__gte=vp.min_property_score,
-        property__quality_score__lte=vp.max_property_score,
-        property__tier__gte=vp.tier_min,
-        property__tier__lte=vp.tier_max,
+    return (
+        qs.annotate(effective_score=F("property__quality_score") + F("room_quality_boost"))
+        .order_by("-effective_score", "private_rate_kobo", "id")
     )
 
-    # Offer-level constraints
-    qs = qs.filter(max_stay_nights__gte=nights)
-
-    # In-memory filters for lead time, blackout, allowed days, payout cap
-    results = []
-    for offer in qs:
-        if is_blackout(vp, check_in, check_out):
-            continue
-        if not allowed_days_ok(vp, check_in):
-            continue
-        if not lead_time_ok(vp, offer, check_in):
-            continue
-        if not payout_cap_ok(vp, offer, nights):
-            continue
-        effective_score = offer.property.quality_score + offer.room_quality_boost
-        results.append((offer, effective_score))
-
-    # Sort by score desc then private rate asc
-    results.sort(key=lambda t: (-t[1], t[0].private_rate_kobo))
-    return results
+
+def query_eligible_offers(
+    voucher: Voucher,
+    check_in: date,
+    check_out: date,
+    *,
+    units: int | None = None,
+    limit: int | None = None,
+    after: tuple | None = None,
+):
+    """
+    (offer, effective_score) pairs, best first. `after` is the
+    (effective_score, private_rate_kobo, id) key of the last row already seen.
+    """
+    qs = eligible_offers_queryset(voucher, check_in, check_out, units=units)
+    if after is not None:
+        score, rate, offer_id = after
+        qs = qs.filter(
+            Q(effective_score__lt=score)
+            | Q(effective_score=score, private_rate_kobo__gt=rate)
+            | Q(effective_score=score, private_rate_kobo=rate, id__gt=offer_id)
+        )
+    if limit is not None:
+        qs = qs[:limit]
+    return [(offer, offer.effective_score) for offer in qs]
+
+
+@dataclass
+class OfferCheck:
+    ok: bool
+    reason: str = ""  # machine-readable code when not ok
+
+
+def is_offer_eligible(
+    voucher: Voucher, offer: OwnerOffer, check_in: date, check_out: date, *, units: int | None = None
+) -> OfferCheck:
+    """
+    The query_eligible_offers rules for a single offer (with .property loaded).
+    Runs at most one query: the index row and, with units set, the inventory check.
+    SKU membership and the city/score/tier gates come from OfferSkuEligibility alone,
+    as in the search, so the two agree even while the index is stale.
+    """
+    vp = voucher.voucher_product
+    prop = offer.property
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        return OfferCheck(False, "invalid_dates")
+
+    now = timezone.now()
+    policy = get_policy(vp)
+    reason = policy.reject_reason(check_in, check_out, now)
+    if reason is not None:
+        return OfferCheck(False, reason)
+
+    if not offer.is_active:
+        return OfferCheck(False, "offer_inactive")
+    if not prop.is_active or prop.approval_status != "approved":
+        return OfferCheck(False, "property_inactive")
+    if not (offer.start_date <= check_in and offer.end_date >= check_out):
+        return OfferCheck(False, "outside_offer_dates")
+    if offer.max_stay_nights < nights:
+        return OfferCheck(False, "max_stay")
+    if offer.min_lead_time_hours > hours_until(check_in, now):
+        return OfferCheck(False, "lead_time")
+    if offer.private_rate_kobo > policy.max_rate_kobo(nights):
+        return OfferCheck(False, "payout_cap")
+
+    qs = OwnerOffer.objects.filter(pk=offer.pk).annotate(
+        indexed=Exists(OfferSkuEligibility.objects.filter(offer=OuterRef("pk"), voucher_product=vp))
+    )
+    fields = ["indexed"]
+    if units is not None:
+        qs = qs.annotate(**availability_annotations(check_in, check_out, units))
+        fields += ["short", "seeded_nights"]
+    row = qs.values(*fields).first()
+    if row is None or not row["indexed"]:
+        return OfferCheck(False, "sku_not_eligible")
+    if units is not None:
+        if row["short"] or (row["seeded_nights"] < nights and offer.units_per_day < units):
+            return OfferCheck(False, "sold_out")
+    return OfferCheck(True)
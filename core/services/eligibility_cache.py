@@ -0,0 +1,171 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from core.models import OwnerOffer
+from .eligibility import query_eligible_offers
+from .policy import hours_until
+from .timeutils import daterange
+
+# Version tokens live in the shared Django cache so every process sees a bump.
+# A bump writes a fresh token rather than incrementing, so an evicted key can
+# never come back with a value an old entry was stored under.
+
+
+def _sku_key(sku: str) -> str:
+    return f"elig:v:{sku}"
+
+
+def _day_key(sku: str, d: date) -> str:
+    return f"elig:v:{sku}:{d.isoformat()}"
+
+
+def _touch(keys):
+    token = time.time_ns()
+    cache.set_many({k: token for k in keys}, timeout=None)
+
+
+def bump_skus(skus):
+    """Invalidate every cached result for these SKUs once the current transaction commits."""
+    keys = [_sku_key(s) for s in set(skus)]
+    if keys:
+        transaction.on_commit(lambda: _touch(keys))
+
+
+def bump_days(skus, start: date, end: date):
+    """Invalidate cached results for these SKUs whose stay covers any night in [start, end)."""
+    keys = [_day_key(s, d) for s in set(skus) for d in daterange(start, end)]
+    if keys:
+        transaction.on_commit(lambda: _touch(keys))
+
+
+def _offer_skus_key(offer_id) -> str:
+    return f"elig:offer-skus:{offer_id}"
+
+
+def offer_skus(offer_id) -> list[str]:
+    """An offer's eligible_skus, read through CACHES so per-row inventory signals skip the query."""
+    key = _offer_skus_key(offer_id)
+    skus = cache.get(key)
+    if skus is None:
+        skus = OwnerOffer.objects.filter(pk=offer_id).values_list("eligible_skus", flat=True).first() or []
+        cache.set(key, skus, timeout=None)
+    return skus
+
+
+def remember_offer_skus(offer):
+    key, skus = _offer_skus_key(offer.pk), list(offer.eligible_skus or [])
+    transaction.on_commit(lambda: cache.set(key, skus, timeout=None))
+
+
+def forget_offer_skus(offer_id):
+    key = _offer_skus_key(offer_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def current_versions(sku: str, check_in: date, check_out: date) -> tuple:
+    keys = [_sku_key(sku)] + [_day_key(sku, d) for d in daterange(check_in, check_out)]
+    found = cache.get_many(keys)
+    missing = [k for k in keys if k not in found]
+    if missing:
+        token = time.time_ns()
+        for k in missing:
+            cache.add(k, token, timeout=None)
+        found.update(cache.get_many(missing))
+    return tuple(found.get(k) for k in keys)
+
+
+class ResultCache:
+    """Thread-safe LRU with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+result_cache = ResultCache(settings.ELIGIBILITY_CACHE_SIZE, settings.ELIGIBILITY_CACHE_TTL_SECONDS)
+
+
+def cached_eligible_offer_rows(
+    voucher,
+    check_in: date,
+    check_out: date,
+    *,
+    units: int | None = None,
+    limit: int | None = None,
+    after: tuple | None = None,
+) -> list[dict]:
+    """
+    SKU-level eligibility rows for one page, shared by every voucher of the SKU.
+    Per-voucher checks (validity window, nights) are the caller's job.
+    """
+    vp = voucher.voucher_product
+    key = (
+        vp.sku, check_in, check_out, units, limit, after,
+        hours_until(check_in),  # lead-time gates move with the clock
+        current_versions(vp.sku, check_in, check_out),
+    )
+    rows = result_cache.get(key)
+    if rows is None:
+        rows = [
+            {
+                "offer_id": offer.id,
+                "property_id": offer.property_id,
+                "property_name": offer.property.name,
+                "room_type": offer.room_type,
+                "private_rate_kobo": offer.private_rate_kobo,
+                "auto_confirm": offer.auto_confirm,
+                "effective_score": score,
+            }
+            for offer, score in query_eligible_offers(
+                voucher, check_in, check_out, units=units, limit=limit, after=after
+            )
+        ]
+        result_cache.set(key, rows)
+    return rows
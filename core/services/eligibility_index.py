@@ -0,0 +1,102 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from django.db import transaction
+from core.models import OfferSkuEligibility, OwnerOffer, Property, VoucherProduct
+
+
+@dataclass
+class IndexDiff:
+    missing: set = field(default_factory=set)  # (sku, offer_id) pairs that should exist
+    stale: set = field(default_factory=set)  # (sku, offer_id) pairs that should not exist
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.stale
+
+
+def property_passes_gates(prop: Property, voucher_product: VoucherProduct) -> bool:
+    return (
+        prop.city == voucher_product.city
+        and voucher_product.min_property_score <= prop.quality_score <= voucher_product.max_property_score
+        and voucher_product.tier_min <= prop.tier <= voucher_product.tier_max
+    )
+
+
+def _apply(diff: IndexDiff):
+    by_sku = {}
+    for sku, offer_id in diff.stale:
+        by_sku.setdefault(sku, []).append(offer_id)
+    for sku, offer_ids in by_sku.items():
+        OfferSkuEligibility.objects.filter(voucher_product_id=sku, offer_id__in=offer_ids).delete()
+    if diff.missing:
+        OfferSkuEligibility.objects.bulk_create(
+            [OfferSkuEligibility(voucher_product_id=sku, offer_id=offer_id) for sku, offer_id in diff.missing],
+            ignore_conflicts=True,
+        )
+
+
+@transaction.atomic
+def sync_offers(offers, *, dry_run: bool = False) -> IndexDiff:
+    """
+    Reconcile index rows for the given offers (each with .property loaded).
+    """
+    offers = list(offers)
+    if not offers:
+        return IndexDiff()
+    skus = {sku for o in offers for sku in (o.eligible_skus or [])}
+    products = {vp.sku: vp for vp in VoucherProduct.objects.filter(sku__in=skus)}
+
+    expected = set()
+    for o in offers:
+        for sku in o.eligible_skus or []:
+            vp = products.get(sku)
+            if vp is not None and property_passes_gates(o.property, vp):
+                expected.add((sku, o.id))
+
+    existing = set(
+        OfferSkuEligibility.objects.filter(offer_id__in=[o.id for o in offers])
+        .values_list("voucher_product_id", "offer_id")
+    )
+    diff = IndexDiff(missing=expected - existing, stale=existing - expected)
+    if not dry_run:
+        _apply(diff)
+    return diff
+
+
+@transaction.atomic
+def sync_product(voucher_product: VoucherProduct, *, dry_run: bool = False) -> IndexDiff:
+    """
+    Reconcile every index row for one SKU. Uses the eligible_skus containment scan,
+    so it belongs on the (rare) product write path, not on the read path.
+    """
+    vp = voucher_product
+    expected_ids = OwnerOffer.objects.filter(
+        eligible_skus__contains=[vp.sku],
+        property__city=vp.city,
+        property__quality_score__gte=vp.min_property_score,
+        property__quality_score__lte=vp.max_property_score,
+        property__tier__gte=vp.tier_min,
+        property__tier__lte=vp.tier_max,
+    ).values_list("id", flat=True)
+    expected = {(vp.sku, offer_id) for offer_id in expected_ids}
+    existing = set(
+        OfferSkuEligibility.objects.filter(voucher_product=vp).values_list("voucher_product_id", "offer_id")
+    )
+    diff = IndexDiff(missing=expected - existing, stale=existing - expected)
+    if not dry_run:
+        _apply(diff)
+    return diff
+
+
+def sync_property(prop: Property) -> IndexDiff:
+    offers = list(OwnerOffer.objects.filter(property=prop))
+    for o in offers:
+        o.property = prop
+    return sync_offers(offers)
+
+
+def sync_all(*, dry_run: bool = False, skus=None) -> dict[str, IndexDiff]:
+    qs = VoucherProduct.objects.all().order_by("sku")
+    if skus:
+        qs = qs.filter(sku__in=skus)
+    return {vp.sku: sync_product(vp, dry_run=dry_run) for vp in qs}
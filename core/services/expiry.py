@@ -0,0 +1,80 @@
+from __future__ import annotations
+import logging
+from dataclasses import dataclass, field
+from django.db import transaction
+from django.utils import timezone
+from core.models import Booking, BookingStatus, OwnerOffer, Voucher, VoucherStatus
+from .inventory import InventoryError, release_reserved_bulk
+from .outbox import audit_payload, emit_many
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_REASON = "owner_confirm_timeout"
+
+
+@dataclass
+class SweepResult:
+    expired: int = 0
+    batches: int = 0
+    failed: list = field(default_factory=list)  # booking ids whose release failed
+
+
+def _expire(bookings: list[Booking], now) -> None:
+    """Release, cancel, reactivate and audit one set of locked bookings; all or nothing."""
+    offers = OwnerOffer.objects.in_bulk({b.offer_id for b in bookings})
+    with transaction.atomic():
+        release_reserved_bulk(
+            (offers[b.offer_id], b.check_in, b.check_out, b.reserved_units) for b in bookings
+        )
+        Booking.objects.filter(id__in=[b.id for b in bookings]).update(
+            status=BookingStatus.CANCELLED, cancelled_reason=EXPIRED_REASON, updated_at=now
+        )
+        Voucher.objects.filter(id__in=[b.voucher_id for b in bookings], status=VoucherStatus.RESERVED).update(
+            status=VoucherStatus.ACTIVE
+        )
+        emit_many(
+            "audit",
+            [
+                audit_payload(
+                    None, "booking_expired", "booking", b.id,
+                    {"offer_id": str(b.offer_id), "confirm_by": b.confirm_by.isoformat()},
+                )
+                for b in bookings
+            ],
+        )
+
+
+def expire_overdue_bookings(*, batch_size: int = 200, max_batches: int | None = None) -> SweepResult:
+    """
+    Cancel PENDING bookings past confirm_by, in batches. Each batch is claimed with
+    FOR UPDATE SKIP LOCKED, so concurrent sweepers and an owner confirming at the same
+    moment never block each other. If a batch's release fails (counter drift), its
+    bookings are retried one by one and the failing ones are left pending and reported.
+    """
+    result = SweepResult()
+    skip: set = set()
+    while max_batches is None or result.batches < max_batches:
+        now = timezone.now()
+        with transaction.atomic():
+            bookings = list(
+                Booking.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(status=BookingStatus.PENDING, confirm_by__lt=now)
+                .exclude(id__in=skip)
+                .order_by("confirm_by", "id")[:batch_size]
+            )
+            if not bookings:
+                break
+            result.batches += 1
+            try:
+                _expire(bookings, now)
+                result.expired += len(bookings)
+            except InventoryError:
+                for booking in bookings:
+                    try:
+                        _expire([booking], now)
+                        result.expired += 1
+                    except InventoryError as e:
+                        logger.error("Could not expire booking %s: %s", booking.id, e)
+                        skip.add(booking.id)
+                        result.failed.append(booking.id)
+    return result
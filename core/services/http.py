@@ -0,0 +1,202 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+# One keep-alive requests.Session per host, shared by every thread of the process, with
+# a bounded connection pool (callers wait for a free connection rather than opening
+# more). Each host also gets a circuit breaker and latency/error counters.
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+_LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class HttpError(Exception):
+    pass
+
+
+class CircuitOpenError(HttpError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failed calls and rejects calls for `reset_seconds`;
+    then lets a single probe through (half-open), which closes it on success.
+    """
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.consecutive_failures = 0
+                self.opened_at = None
+                return
+            self.consecutive_failures += 1
+            if self.opened_at is not None or self.consecutive_failures >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+class HostMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0  # transport errors and 5xx, after retries
+        self.retries = 0
+        self.rejected = 0  # short-circuited by the breaker
+        self.status_counts: dict[str, int] = {}
+        self.latency_total_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.latency_buckets = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms: float, status: int | None):
+        with self._lock:
+            self.requests += 1
+            self.latency_total_ms += elapsed_ms
+            self.latency_max_ms = max(self.latency_max_ms, elapsed_ms)
+            i = 0
+            while i < len(_LATENCY_BUCKETS_MS) and elapsed_ms > _LATENCY_BUCKETS_MS[i]:
+                i += 1
+            self.latency_buckets[i] += 1
+            key = str(status) if status is not None else "transport_error"
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            buckets = [f"<={b}ms" for b in _LATENCY_BUCKETS_MS] + [f">{_LATENCY_BUCKETS_MS[-1]}ms"]
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "status_counts": dict(self.status_counts),
+                "latency_avg_ms": round(self.latency_total_ms / self.requests, 1) if self.requests else None,
+                "latency_max_ms": round(self.latency_max_ms, 1),
+                "latency_histogram": dict(zip(buckets, self.latency_buckets)),
+            }
+
+
+class _Host:
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.HTTP_POOL_MAXSIZE, pool_block=True, max_retries=0
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.breaker = CircuitBreaker(settings.HTTP_BREAKER_FAILURES, settings.HTTP_BREAKER_RESET_SECONDS)
+        self.metrics = HostMetrics()
+
+
+class HttpClient:
+    """Thread-safe; use the module-level `http_client`."""
+
+    def __init__(self):
+        self._hosts: dict[str, _Host] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url: str) -> tuple[str, _Host]:
+        parts = urlsplit(url)
+        name = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if name not in self._hosts:
+                self._hosts[name] = _Host()
+            return name, self._hosts[name]
+
+    def request(
+        self, method: str, url: str, *, idempotent: bool | None = None,
+        connect_timeout: float | None = None, read_timeout: float | None = None, **kwargs,
+    ) -> requests.Response:
+        """
+        Send one request through the host's pooled session. Idempotent calls (GET & co,
+        or idempotent=True) are retried on transport errors and 429/502/503/504 with
+        jittered exponential backoff; other calls are retried only when the connection
+        could not be established, since the request never reached the server. Raises
+        CircuitOpenError while the host's breaker is open and HttpError on transport
+        failure; HTTP error responses are returned as-is.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        timeout = (connect_timeout or settings.HTTP_CONNECT_TIMEOUT, read_timeout or settings.HTTP_READ_TIMEOUT)
+        name, host = self._host(url)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not host.breaker.allow():
+                host.metrics.count("rejected")
+                raise CircuitOpenError(f"Circuit open for {name}")
+            started = time.monotonic()
+            response, error = None, None
+            try:
+                response = host.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            host.metrics.observe((time.monotonic() - started) * 1000, response.status_code if response is not None else None)
+
+            failed = error is not None or response.status_code >= 500
+            host.breaker.record(not failed)
+            retryable = (
+                isinstance(error, requests.ConnectTimeout)
+                or (idempotent and (error is not None or response.status_code in RETRY_STATUSES))
+            )
+            if retryable and attempt <= settings.HTTP_MAX_RETRIES:
+                host.metrics.count("retries")
+                time.sleep(random.uniform(0, settings.HTTP_BACKOFF_SECONDS * 2 ** (attempt - 1)))
+                continue
+            if failed:
+                host.metrics.count("errors")
+            if error is not None:
+                raise HttpError(f"{method} {name} failed: {error}") from error
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {
+            name: {**host.metrics.stats(), "circuit": host.breaker.state}
+            for name, host in sorted(hosts.items())
+        }
+
+
+http_client = HttpClient()
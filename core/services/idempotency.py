@@ -0,0 +1,133 @@
+from __future__ import annotations
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from core.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request, args, kwargs) -> str:
+    body = json.dumps(
+        {"method": request.method, "path": request.path, "args": args, "kwargs": kwargs, "data": request.data},
+        sort_keys=True,
+        cls=DjangoJSONEncoder,
+    )
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _claim(user, scope: str, key: str, fingerprint: str) -> tuple[IdempotencyKey, bool]:
+    """(record, owned): owned means this request must execute the view."""
+    now = timezone.now()
+    lock_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user, scope=scope, key=key, request_hash=fingerprint, locked_until=lock_until,
+                expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+            )
+            return record, True
+    except IntegrityError:
+        pass
+
+    try:
+        record = IdempotencyKey.objects.get(user=user, scope=scope, key=key)
+    except IdempotencyKey.DoesNotExist:
+        # Released (failed first execution) between our insert and this read
+        return _claim(user, scope, key, fingerprint)
+    if record.expires_at <= now:
+        # Expired: start over as if the key were new
+        IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+        return _claim(user, scope, key, fingerprint)
+    if record.status_code is None and record.locked_until <= now and record.request_hash == fingerprint:
+        # The first execution died without recording anything; take it over
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, status_code__isnull=True, locked_until__lte=now
+        ).update(locked_until=lock_until)
+        if taken:
+            record.locked_until = lock_until
+            return record, True
+    return record, False
+
+
+def _wait_for_outcome(record: IdempotencyKey, deadline: float) -> IdempotencyKey | None:
+    """None if the first execution failed and released the key meanwhile."""
+    while record.status_code is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            record.refresh_from_db(fields=["status_code", "response_body"])
+        except IdempotencyKey.DoesNotExist:
+            return None
+    return record
+
+
+def idempotent(scope: str):
+    """
+    APIView method decorator: requests carrying an Idempotency-Key run once per
+    (user, scope, key). Replays get the stored response with Idempotent-Replayed: true;
+    a duplicate that arrives while the first is in flight waits up to
+    IDEMPOTENCY_WAIT_SECONDS for it, then gets 409. 5xx outcomes and exceptions are
+    not stored, so the client may retry them with the same key; a duplicate waiting
+    on such a failure takes the key over and runs the view itself.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return method(view, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            fingerprint = request_fingerprint(request, args, kwargs)
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+            record, owned = _claim(request.user, scope, key, fingerprint)
+            while not owned:
+                if record.request_hash != fingerprint:
+                    return Response(
+                        {"detail": f"{HEADER} was already used with a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                waited = _wait_for_outcome(record, deadline)
+                if waited is None:
+                    # The first execution failed and released the key: run it ourselves
+                    record, owned = _claim(request.user, scope, key, fingerprint)
+                    continue
+                if waited.status_code is None:
+                    return Response(
+                        {"detail": f"A request with this {HEADER} is still in progress"},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return Response(waited.response_body, status=waited.status_code, headers={"Idempotent-Replayed": "true"})
+
+            try:
+                response = method(view, request, *args, **kwargs)
+            except Exception:
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+                raise
+            if response.status_code >= 500:
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+            else:
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    status_code=response.status_code, response_body=response.data
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys() -> int:
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -1,8 +1,11 @@
 from __future__ import annotations
-from datetime import date
-from django.db import transaction
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import F
+from django.utils import timezone
 from core.models import OfferInventoryDay, OwnerOffer
+from .eligibility_cache import bump_days
 
 
 class InventoryError(Exception):
@@ -28,19 +31,97 @@ def ensure_inventory_seeded(offer: OwnerOffer, start: date, end: date):
         OfferInventoryDay.objects.bulk_create(to_create, ignore_conflicts=True)
 
 
+def materialize_inventory(offer_ids=None, *, horizon_days: int | None = None) -> int:
+    """
+    Insert missing OfferInventoryDay rows for every active offer night in
+    [max(start_date, today), min(end_date, today + horizon)) in one statement.
+    Existing rows are left alone. Returns the number of rows created.
+    """
+    if _monthly():
+        from . import inventory_monthly
+        return inventory_monthly.materialize(offer_ids, horizon_days=horizon_days)
+    today = timezone.localdate()
+    until = today + timedelta(days=horizon_days or settings.INVENTORY_HORIZON_DAYS)
+    offer_filter = "AND o.id = ANY(%(offer_ids)s)" if offer_ids is not None else ""
+    sql = f"""
+        INSERT INTO {OfferInventoryDay._meta.db_table} (offer_id, date, capacity, reserved, booked)
+        SELECT o.id, d::date, o.units_per_day, 0, 0
+        FROM {OwnerOffer._meta.db_table} o
+        CROSS JOIN LATERAL generate_series(
+            GREATEST(o.start_date, %(today)s)::timestamp,
+            (LEAST(o.end_date, %(until)s) - 1)::timestamp,
+            interval '1 day'
+        ) AS d
+        WHERE o.is_active {offer_filter}
+        ON CONFLICT (offer_id, date) DO NOTHING
+    """
+    params = {"today": today, "until": until, "offer_ids": list(offer_ids or [])}
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.rowcount
+
+
+def propagate_units_per_day(offer: OwnerOffer, previous_units: int) -> int:
+    """
+    Carry a units_per_day change onto future nights that still hold the old default.
+    Per-day overrides (capacity != previous_units) are kept.
+    """
+    if _monthly():
+        from . import inventory_monthly
+        return inventory_monthly.propagate_units_per_day(offer, previous_units)
+    return OfferInventoryDay.objects.filter(
+        offer=offer, date__gte=timezone.localdate(), capacity=previous_units
+    ).update(capacity=offer.units_per_day)
+
+
+def inventory_snapshot(offer: OwnerOffer, start: date, end: date) -> dict[date, tuple[int, int, int]]:
+    """(capacity, reserved, booked) for each stored night of the offer in [start, end)."""
+    if _monthly():
+        from . import inventory_monthly
+        return inventory_monthly.snapshot(offer, start, end)
+    return {
+        d: (capacity, reserved, booked)
+        for d, capacity, reserved, booked in OfferInventoryDay.objects.filter(
+            offer=offer, date__gte=start, date__lt=end
+        ).values_list("date", "capacity", "reserved", "booked")
+    }
+
+
+def _monthly() -> bool:
+    return settings.INVENTORY_STORAGE == "monthly"
+
+
+def _missing_nights(offer: OwnerOffer, check_in: date, check_out: date) -> bool:
+    seeded = OfferInventoryDay.objects.filter(offer=offer, date__gte=check_in, date__lt=check_out).count()
+    return seeded < (check_out - check_in).days
+
+
+def _lock_rows(offer: OwnerOffer, check_in: date, check_out: date) -> list[OfferInventoryDay]:
+    """
+    Rows are materialized ahead of time (materialize_inventory), so seeding is only a
+    fallback for stays past the horizon or offers created before it was in place.
+    """
+    def locked():
+        return list(
+            OfferInventoryDay.objects.select_for_update()
+            .filter(offer=offer, date__gte=check_in, date__lt=check_out)
+            .order_by("date")
+        )
+
+    rows = locked()
+    if len(rows) != (check_out - check_in).days:
+        ensure_inventory_seeded(offer, check_in, check_out)
+        rows = locked()
+    return rows
+
+
 @transaction.atomic
-def reserve_or_book_inventory(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+def _locking_reserve_or_book(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
     """
     mode: 'reserve' increments reserved; 'book' increments booked.
     Locks inventory rows for the entire date range.
     """
-    ensure_inventory_seeded(offer, check_in, check_out)
-
-    rows = list(
-        OfferInventoryDay.objects.select_for_update()
-        .filter(offer=offer, date__gte=check_in, date__lt=check_out)
-        .order_by("date")
-    )
+    rows = _lock_rows(offer, check_in, check_out)
     if len(rows) != (check_out - check_in).days:
         raise InventoryError("Inventory rows missing for some nights")
 
@@ -55,16 +136,12 @@ def reserve_or_book_inventory(*, offer: OwnerOffer, check_in: date, check_out: d
         OfferInventoryDay.objects.filter(id__in=[r.id for r in rows]).update(booked=F("booked") + units)
     else:
         raise ValueError("mode must be 'reserve' or 'book'")
+    bump_days(offer.eligible_skus or [], check_in, check_out)
 
 
 @transaction.atomic
-def convert_reserved_to_booked(*, offer: OwnerOffer, check_in: date, check_out: date, units: int):
-    ensure_inventory_seeded(offer, check_in, check_out)
-    rows = list(
-        OfferInventoryDay.objects.select_for_update()
-        .filter(offer=offer, date__gte=check_in, date__lt=check_out)
-        .order_by("date")
-    )
+def _locking_convert(*, offer: OwnerOffer, check_in: date, check_out: date, units: int):
+    rows = _lock_rows(offer, check_in, check_out)
     for r in rows:
         if r.reserved < units:
             raise InventoryError(f"Not enough reserved inventory to convert for {r.date}")
@@ -76,13 +153,8 @@ def convert_reserved_to_booked(*, offer: OwnerOffer, check_in: date, check_out:
 
 
 @transaction.atomic
-def release_reserved_or_booked(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
-    ensure_inventory_seeded(offer, check_in, check_out)
-    rows = list(
-        OfferInventoryDay.objects.select_for_update()
-        .filter(offer=offer, date__gte=check_in, date__lt=check_out)
-        .order_by("date")
-    )
+def _locking_release(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+    rows = _lock_rows(offer, check_in, check_out)
     if mode == "reserve":
         for r in rows:
             if r.reserved < units:
@@ -95,3 +167,258 @@ def release_reserved_or_booked(*, offer: OwnerOffer, check_in: date, check_out:
         OfferInventoryDay.objects.filter(id__in=[r.id for r in rows]).update(booked=F("booked") - units)
     else:
         raise ValueError("mode must be 'reserve' or 'book'")
+    bump_days(offer.eligible_skus or [], check_in, check_out)
+
+
+# Conditional engine: the availability check and the increment are one guarded
+# UPDATE ... RETURNING. Postgres re-evaluates the WHERE clause against the latest
+# committed row after waiting on a concurrent writer, so a night that went short
+# is simply not updated. Fewer returned rows than nights means some night failed;
+# raising rolls back the (savepoint of the) partial update.
+
+_GUARDED_UPDATES = {
+    ("reserve", "take"): ("reserved = reserved + %(units)s", "capacity - reserved - booked >= %(units)s", "Sold out"),
+    ("book", "take"): ("booked = booked + %(units)s", "capacity - reserved - booked >= %(units)s", "Sold out"),
+    ("reserve", "convert"): (
+        "reserved = reserved - %(units)s, booked = booked + %(units)s",
+        "reserved >= %(units)s",
+        "Not enough reserved inventory to convert",
+    ),
+    ("reserve", "release"): ("reserved = reserved - %(units)s", "reserved >= %(units)s", "Reserved underflow"),
+    ("book", "release"): ("booked = booked - %(units)s", "booked >= %(units)s", "Booked underflow"),
+}
+
+
+@transaction.atomic
+def _guarded_update(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str, op: str):
+    from .timeutils import daterange
+    if mode not in ("reserve", "book"):
+        raise ValueError("mode must be 'reserve' or 'book'")
+    assignment, guard, message = _GUARDED_UPDATES[(mode, op)]
+    sql = (
+        f"UPDATE {OfferInventoryDay._meta.db_table} SET {assignment} "
+        f"WHERE offer_id = %(offer_id)s AND date >= %(check_in)s AND date < %(check_out)s AND {guard} "
+        f"RETURNING date"
+    )
+    params = {"units": units, "offer_id": offer.id, "check_in": check_in, "check_out": check_out}
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        updated = {row[0] for row in cur.fetchall()}
+    for d in daterange(check_in, check_out):
+        if d not in updated:
+            raise InventoryError(f"{message} for {d}")
+
+
+def _guarded_update_seeding(**kwargs):
+    """_guarded_update, seeding and retrying once only if the failure was missing rows."""
+    try:
+        _guarded_update(**kwargs)
+    except InventoryError:
+        offer, check_in, check_out = kwargs["offer"], kwargs["check_in"], kwargs["check_out"]
+        if not _missing_nights(offer, check_in, check_out):
+            raise
+        ensure_inventory_seeded(offer, check_in, check_out)
+        _guarded_update(**kwargs)
+
+
+def _conditional_reserve_or_book(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+    _guarded_update_seeding(offer=offer, check_in=check_in, check_out=check_out, units=units, mode=mode, op="take")
+    bump_days(offer.eligible_skus or [], check_in, check_out)
+
+
+def _conditional_convert(*, offer: OwnerOffer, check_in: date, check_out: date, units: int):
+    _guarded_update_seeding(
+        offer=offer, check_in=check_in, check_out=check_out, units=units, mode="reserve", op="convert"
+    )
+
+
+def _conditional_release(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+    _guarded_update_seeding(offer=offer, check_in=check_in, check_out=check_out, units=units, mode=mode, op="release")
+    bump_days(offer.eligible_skus or [], check_in, check_out)
+
+
+def _conditional() -> bool:
+    return settings.INVENTORY_ENGINE == "conditional"
+
+
+def nightly_totals(stays) -> dict[OwnerOffer, dict[date, int]]:
+    from .timeutils import daterange
+    per_offer: dict = {}
+    offers = {}
+    for offer, check_in, check_out, units in stays:
+        offers.setdefault(offer.id, offer)
+        nights = per_offer.setdefault(offer.id, {})
+        for d in daterange(check_in, check_out):
+            nights[d] = nights.get(d, 0) + units
+    return {offers[offer_id]: nights for offer_id, nights in per_offer.items()}
+
+
+def lock_inventory(per_offer: dict[OwnerOffer, dict[date, int]]):
+    """
+    Lock every stored night in per_offer with one SELECT ... FOR UPDATE ordered by
+    (offer_id, date). Writers that lock through here never wait on each other in a cycle.
+    """
+    if _monthly():
+        from . import inventory_monthly
+        return inventory_monthly.lock_months(per_offer)
+    offer_ids, dates = [], []
+    for offer, nights in per_offer.items():
+        offer_ids += [offer.id] * len(nights)
+        dates += list(nights)
+    sql = (
+        f"SELECT d.id FROM {OfferInventoryDay._meta.db_table} AS d "
+        f"JOIN unnest(%s::uuid[], %s::date[]) AS x(offer_id, date) ON d.offer_id = x.offer_id AND d.date = x.date "
+        f"ORDER BY d.offer_id, d.date FOR UPDATE OF d"
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, [offer_ids, dates])
+
+
+# op -> (assignment, error message); every op is guarded by reserved >= units
+_BULK_UPDATES = {
+    "release": ("reserved = d.reserved - x.units", "Reserved underflow"),
+    "convert": (
+        "reserved = d.reserved - x.units, booked = d.booked + x.units",
+        "Not enough reserved inventory to convert",
+    ),
+}
+
+
+@transaction.atomic
+def _bulk_reserved_update(stays, op: str):
+    per_offer = nightly_totals(stays)
+    lock_inventory(per_offer)
+    if _monthly():
+        from . import inventory_monthly
+        inventory_monthly.bulk_reserved_update(per_offer, op)
+        return per_offer
+    assignment, message = _BULK_UPDATES[op]
+    sql = (
+        f"UPDATE {OfferInventoryDay._meta.db_table} AS d SET {assignment} "
+        f"FROM unnest(%(dates)s::date[], %(units)s::integer[]) AS x(date, units) "
+        f"WHERE d.offer_id = %(offer_id)s AND d.date = x.date AND d.reserved >= x.units "
+        f"RETURNING d.date"
+    )
+    with connection.cursor() as cur:
+        for offer, nights in sorted(per_offer.items(), key=lambda item: str(item[0].id)):
+            dates = sorted(nights)
+            params = {"dates": dates, "units": [nights[d] for d in dates], "offer_id": offer.id}
+            cur.execute(sql, params)
+            updated = {row[0] for row in cur.fetchall()}
+            for d in dates:
+                if d not in updated:
+                    raise InventoryError(f"{message} for {d} on offer {offer.id}")
+    return per_offer
+
+
+def release_reserved_bulk(stays):
+    """
+    Release reserved units for many (offer, check_in, check_out, units) stays at once:
+    rows are locked in (offer, date) order, per-night totals are summed per offer and
+    each offer gets one guarded UPDATE. Raises InventoryError (and changes nothing) on
+    any underflow or missing night.
+    """
+    per_offer = _bulk_reserved_update(stays, "release")
+    for offer, nights in per_offer.items():
+        bump_days(offer.eligible_skus or [], min(nights), max(nights) + timedelta(days=1))
+
+
+def convert_reserved_bulk(stays):
+    """Bulk counterpart of convert_reserved_to_booked; same contract as release_reserved_bulk."""
+    _bulk_reserved_update(stays, "convert")
+
+
+_CAPACITY_SQL = """
+    WITH x AS (
+        SELECT * FROM unnest(%(dates)s::date[], %(capacities)s::integer[]) AS x(date, capacity)
+    ),
+    created AS (
+        INSERT INTO {table} (offer_id, date, capacity, reserved, booked)
+        SELECT %(offer_id)s, x.date, COALESCE(x.capacity, 0), 0, 0 FROM x
+        ON CONFLICT (offer_id, date) DO NOTHING
+        RETURNING date
+    ),
+    updated AS (
+        UPDATE {table} AS d SET capacity = COALESCE(x.capacity, d.reserved + d.booked)
+        FROM x
+        WHERE d.offer_id = %(offer_id)s AND d.date = x.date
+          AND COALESCE(x.capacity, d.reserved + d.booked) >= d.reserved + d.booked
+        RETURNING d.date
+    )
+    SELECT date FROM created UNION ALL SELECT date FROM updated
+"""
+SET_CAPACITY_ATTEMPTS = 3
+
+
+def _apply_nightly_capacity(offer: OwnerOffer, dates: list[date], capacities: list[int | None]) -> set[date]:
+    if _monthly():
+        from . import inventory_monthly
+        return inventory_monthly.set_nightly_capacity(offer, dates, capacities)
+    # Data-modifying CTEs share one snapshot: the UPDATE only sees rows that existed
+    # before, the INSERT only creates the ones that did not. A night inserted by a
+    # concurrent transaction is neither, so it is missing from the result; rerunning
+    # the statement (same values, so idempotent) sees it.
+    params = {"dates": dates, "capacities": capacities, "offer_id": offer.id}
+    with connection.cursor() as cur:
+        cur.execute(_CAPACITY_SQL.format(table=OfferInventoryDay._meta.db_table), params)
+        return {row[0] for row in cur.fetchall()}
+
+
+def set_nightly_capacity(offer: OwnerOffer, changes: dict[date, int | None]) -> list[dict]:
+    """
+    Apply per-night capacity overrides in one set-based statement. None means stop-sell:
+    capacity becomes reserved + booked, so nothing more sells and nothing is lost.
+    All or nothing: if any night would drop below reserved + booked, no night changes
+    and the conflicting nights are returned. Nights skipped for any other reason (a
+    concurrent insert) are retried; InventoryError if they still do not apply.
+    """
+    dates = sorted(changes)
+    capacities = [changes[d] for d in dates]
+    with transaction.atomic():
+        for _attempt in range(SET_CAPACITY_ATTEMPTS):
+            applied = _apply_nightly_capacity(offer, dates, capacities)
+            missing = [d for d in dates if d not in applied]
+            if not missing:
+                bump_days(offer.eligible_skus or [], dates[0], dates[-1] + timedelta(days=1))
+                return []
+
+            current = inventory_snapshot(offer, missing[0], missing[-1] + timedelta(days=1))
+            conflicts = []
+            for d in missing:
+                _capacity, reserved, booked = current.get(d, (0, 0, 0))
+                if changes[d] is not None and changes[d] < reserved + booked:
+                    conflicts.append(
+                        {"date": d, "requested_capacity": changes[d], "reserved": reserved, "booked": booked}
+                    )
+            if conflicts:
+                transaction.set_rollback(True)
+                return conflicts
+        raise InventoryError(
+            f"Could not set capacity on offer {offer.id} for {len(missing)} night(s) from {missing[0]}"
+        )
+
+
+def _engine(locking, conditional, monthly_name: str):
+    if _monthly():
+        from . import inventory_monthly
+        return getattr(inventory_monthly, monthly_name)
+    return conditional if _conditional() else locking
+
+
+def reserve_or_book_inventory(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+    """
+    mode: 'reserve' increments reserved; 'book' increments booked.
+    Raises InventoryError (and changes nothing) if any night lacks capacity.
+    """
+    engine = _engine(_locking_reserve_or_book, _conditional_reserve_or_book, "reserve_or_book")
+    engine(offer=offer, check_in=check_in, check_out=check_out, units=units, mode=mode)
+
+
+def convert_reserved_to_booked(*, offer: OwnerOffer, check_in: date, check_out: date, units: int):
+    engine = _engine(_locking_convert, _conditional_convert, "convert")
+    engine(offer=offer, check_in=check_in, check_out=check_out, units=units)
+
+
+def release_reserved_or_booked(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+    engine = _engine(_locking_release, _conditional_release, "release")
+    engine(offer=offer, check_in=check_in, check_out=check_out, units=units, mode=mode)
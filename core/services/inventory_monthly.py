@@ -0,0 +1,312 @@
+from __future__ import annotations
+import calendar
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, IntegerField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from core.models import OfferInventoryMonth, OwnerOffer
+from .eligibility_cache import bump_days
+from .inventory import InventoryError
+
+# Packed storage: an offer's capacity/reserved/booked for a calendar month live in three
+# integer arrays on one row, so a stay touches one or two rows. Each operation is a
+# guarded slice UPDATE per month, in the spirit of the conditional row engine.
+
+TABLE = OfferInventoryMonth._meta.db_table
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _days_in_month(month: date) -> int:
+    return calendar.monthrange(month.year, month.month)[1]
+
+
+def _month_slices(check_in: date, check_out: date):
+    """Yield (month, lo, hi) with 1-based inclusive array bounds covering the stay."""
+    cur = check_in
+    while cur < check_out:
+        month = month_start(cur)
+        next_month = month + timedelta(days=_days_in_month(month))
+        last = min(check_out, next_month) - timedelta(days=1)
+        yield month, cur.day, last.day
+        cur = next_month
+
+
+def ensure_months_seeded(offer: OwnerOffer, check_in: date, check_out: date):
+    rows = []
+    for month, _lo, _hi in _month_slices(check_in, check_out):
+        n = _days_in_month(month)
+        rows.append(
+            OfferInventoryMonth(
+                offer=offer, month=month, capacity=[offer.units_per_day] * n, reserved=[0] * n, booked=[0] * n
+            )
+        )
+    OfferInventoryMonth.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+# Per-night guards, as SQL over unnest(capacity, reserved, booked) AS t(c, r, b) and as
+# the same predicate in Python for naming the failing night.
+_GUARDS = {
+    "free": ("c - r - b >= %(units)s", lambda c, r, b, units: c - r - b >= units),
+    "reserved": ("r >= %(units)s", lambda c, r, b, units: r >= units),
+    "booked": ("b >= %(units)s", lambda c, r, b, units: b >= units),
+}
+
+# (mode, op) -> ({column: sign}, guard, error message)
+_OPS = {
+    ("reserve", "take"): ({"reserved": "+"}, "free", "Sold out"),
+    ("book", "take"): ({"booked": "+"}, "free", "Sold out"),
+    ("reserve", "convert"): ({"reserved": "-", "booked": "+"}, "reserved", "Not enough reserved inventory to convert"),
+    ("reserve", "release"): ({"reserved": "-"}, "reserved", "Reserved underflow"),
+    ("book", "release"): ({"booked": "-"}, "booked", "Booked underflow"),
+}
+
+
+def _first_failing_night(offer: OwnerOffer, month: date, lo: int, hi: int, guard: str, units: int) -> date | None:
+    row = OfferInventoryMonth.objects.filter(offer=offer, month=month).values_list(
+        "capacity", "reserved", "booked"
+    ).first()
+    if row is None:
+        return month + timedelta(days=lo - 1)
+    ok = _GUARDS[guard][1]
+    for i in range(lo, hi + 1):
+        if not ok(row[0][i - 1], row[1][i - 1], row[2][i - 1], units):
+            return month + timedelta(days=i - 1)
+    return None
+
+
+@transaction.atomic
+def _apply(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str, op: str):
+    if mode not in ("reserve", "book"):
+        raise ValueError("mode must be 'reserve' or 'book'")
+    columns, guard, message = _OPS[(mode, op)]
+    assignments = ", ".join(
+        f"{col}[%(lo)s:%(hi)s] = ARRAY("
+        f"SELECT x {sign} %(units)s FROM unnest({col}[%(lo)s:%(hi)s]) WITH ORDINALITY AS t(x, i) ORDER BY i)"
+        for col, sign in columns.items()
+    )
+    sql = (
+        f"UPDATE {TABLE} SET {assignments} "
+        f"WHERE offer_id = %(offer_id)s AND month = %(month)s AND ("
+        f"SELECT bool_and({_GUARDS[guard][0]}) "
+        f"FROM unnest(capacity[%(lo)s:%(hi)s], reserved[%(lo)s:%(hi)s], booked[%(lo)s:%(hi)s]) AS t(c, r, b))"
+    )
+    with connection.cursor() as cur:
+        for month, lo, hi in _month_slices(check_in, check_out):
+            cur.execute(sql, {"units": units, "offer_id": offer.id, "month": month, "lo": lo, "hi": hi})
+            if cur.rowcount != 1:
+                failed = _first_failing_night(offer, month, lo, hi, guard, units)
+                raise InventoryError(f"{message} for {failed}")
+
+
+def _apply_seeding(**kwargs):
+    try:
+        _apply(**kwargs)
+    except InventoryError:
+        offer, check_in, check_out = kwargs["offer"], kwargs["check_in"], kwargs["check_out"]
+        months = [m for m, _lo, _hi in _month_slices(check_in, check_out)]
+        if OfferInventoryMonth.objects.filter(offer=offer, month__in=months).count() == len(months):
+            raise
+        ensure_months_seeded(offer, check_in, check_out)
+        _apply(**kwargs)
+
+
+def reserve_or_book(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+    _apply_seeding(offer=offer, check_in=check_in, check_out=check_out, units=units, mode=mode, op="take")
+    bump_days(offer.eligible_skus or [], check_in, check_out)
+
+
+def convert(*, offer: OwnerOffer, check_in: date, check_out: date, units: int):
+    _apply_seeding(offer=offer, check_in=check_in, check_out=check_out, units=units, mode="reserve", op="convert")
+
+
+def release(*, offer: OwnerOffer, check_in: date, check_out: date, units: int, mode: str):
+    _apply_seeding(offer=offer, check_in=check_in, check_out=check_out, units=units, mode=mode, op="release")
+    bump_days(offer.eligible_skus or [], check_in, check_out)
+
+
+def lock_months(per_offer: dict[OwnerOffer, dict[date, int]]):
+    """Monthly counterpart of inventory.lock_inventory: (offer_id, month) order."""
+    offer_ids, months = [], []
+    for offer, nights in per_offer.items():
+        for month in sorted({month_start(d) for d in nights}):
+            offer_ids.append(offer.id)
+            months.append(month)
+    sql = (
+        f"SELECT m.id FROM {TABLE} AS m "
+        f"JOIN unnest(%s::uuid[], %s::date[]) AS x(offer_id, month) ON m.offer_id = x.offer_id AND m.month = x.month "
+        f"ORDER BY m.offer_id, m.month FOR UPDATE OF m"
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, [offer_ids, months])
+
+
+def _shift(column: str, sign: str) -> str:
+    return f"""{column} = ARRAY(
+            SELECT t.v {sign} COALESCE(x.units, 0)
+            FROM unnest(m.{column}) WITH ORDINALITY AS t(v, i)
+            LEFT JOIN unnest(%(dates)s::date[], %(units)s::integer[]) AS x(date, units)
+                ON x.date = m.month + (t.i::int - 1)
+            ORDER BY t.i
+        )"""
+
+
+# op -> (assignments, error message); every op is guarded by reserved >= units
+_BULK_UPDATES = {
+    "release": ([("reserved", "-")], "Reserved underflow"),
+    "convert": ([("reserved", "-"), ("booked", "+")], "Not enough reserved inventory to convert"),
+}
+
+
+def bulk_reserved_update(per_offer: dict[OwnerOffer, dict[date, int]], op: str):
+    """Monthly counterpart of inventory._bulk_reserved_update: one UPDATE per offer."""
+    shifts, message = _BULK_UPDATES[op]
+    sql = f"""
+        UPDATE {TABLE} AS m SET {", ".join(_shift(column, sign) for column, sign in shifts)}
+        WHERE m.offer_id = %(offer_id)s AND m.month = ANY(%(months)s::date[]) AND NOT EXISTS (
+            SELECT 1 FROM unnest(m.reserved) WITH ORDINALITY AS t(r, i)
+            JOIN unnest(%(dates)s::date[], %(units)s::integer[]) AS x(date, units)
+                ON x.date = m.month + (t.i::int - 1)
+            WHERE t.r < x.units
+        )
+        RETURNING m.month
+    """
+    with connection.cursor() as cur:
+        for offer, nights in sorted(per_offer.items(), key=lambda item: str(item[0].id)):
+            dates = sorted(nights)
+            months = sorted({month_start(d) for d in dates})
+            params = {"dates": dates, "units": [nights[d] for d in dates], "offer_id": offer.id, "months": months}
+            cur.execute(sql, params)
+            updated = {row[0] for row in cur.fetchall()}
+            for month in months:
+                if month not in updated:
+                    raise InventoryError(f"{message} in {month:%Y-%m} on offer {offer.id}")
+
+
+def set_nightly_capacity(offer: OwnerOffer, dates: list[date], capacities: list[int | None]) -> set[date]:
+    """Monthly counterpart of inventory.set_nightly_capacity; returns the nights applied."""
+    months = sorted({month_start(d) for d in dates})
+    OfferInventoryMonth.objects.bulk_create(
+        [
+            OfferInventoryMonth(
+                offer=offer, month=m, capacity=[offer.units_per_day] * _days_in_month(m),
+                reserved=[0] * _days_in_month(m), booked=[0] * _days_in_month(m),
+            )
+            for m in months
+        ],
+        ignore_conflicts=True,
+    )
+    sql = f"""
+        WITH x AS (
+            SELECT * FROM unnest(%(dates)s::date[], %(capacities)s::integer[]) AS x(date, capacity)
+        )
+        UPDATE {TABLE} AS m SET capacity = ARRAY(
+            SELECT CASE WHEN x.date IS NULL THEN t.c ELSE COALESCE(x.capacity, t.r + t.b) END
+            FROM unnest(m.capacity, m.reserved, m.booked) WITH ORDINALITY AS t(c, r, b, i)
+            LEFT JOIN x ON x.date = m.month + (t.i::int - 1)
+            ORDER BY t.i
+        )
+        WHERE m.offer_id = %(offer_id)s AND m.month = ANY(%(months)s::date[]) AND NOT EXISTS (
+            SELECT 1 FROM unnest(m.reserved, m.booked) WITH ORDINALITY AS t(r, b, i)
+            JOIN x ON x.date = m.month + (t.i::int - 1)
+            WHERE x.capacity < t.r + t.b
+        )
+        RETURNING m.month
+    """
+    params = {"dates": dates, "capacities": capacities, "offer_id": offer.id, "months": months}
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        updated = {row[0] for row in cur.fetchall()}
+    return {d for d in dates if month_start(d) in updated}
+
+
+def materialize(offer_ids=None, *, horizon_days: int | None = None) -> int:
+    """Monthly counterpart of inventory.materialize_inventory."""
+    today = timezone.localdate()
+    until = today + timedelta(days=horizon_days or settings.INVENTORY_HORIZON_DAYS)
+    offer_filter = "AND o.id = ANY(%(offer_ids)s)" if offer_ids is not None else ""
+    sql = f"""
+        INSERT INTO {TABLE} (offer_id, month, capacity, reserved, booked)
+        SELECT o.id, mo::date, array_fill(o.units_per_day, ARRAY[n]), array_fill(0, ARRAY[n]), array_fill(0, ARRAY[n])
+        FROM {OwnerOffer._meta.db_table} o
+        CROSS JOIN LATERAL generate_series(
+            date_trunc('month', GREATEST(o.start_date, %(today)s)::timestamp),
+            (LEAST(o.end_date, %(until)s) - 1)::timestamp,
+            interval '1 month'
+        ) AS mo
+        CROSS JOIN LATERAL (SELECT ((mo + interval '1 month')::date - mo::date) AS n) AS len
+        WHERE o.is_active {offer_filter}
+        ON CONFLICT (offer_id, month) DO NOTHING
+    """
+    params = {"today": today, "until": until, "offer_ids": list(offer_ids or [])}
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.rowcount
+
+
+def propagate_units_per_day(offer: OwnerOffer, previous_units: int) -> int:
+    """Monthly counterpart of inventory.propagate_units_per_day."""
+    today = timezone.localdate()
+    sql = f"""
+        UPDATE {TABLE} SET capacity = ARRAY(
+            SELECT CASE WHEN month + (i::int - 1) >= %(today)s AND c = %(old)s THEN %(new)s ELSE c END
+            FROM unnest(capacity) WITH ORDINALITY AS t(c, i) ORDER BY i
+        )
+        WHERE offer_id = %(offer_id)s AND month >= %(first)s
+    """
+    params = {
+        "today": today, "old": previous_units, "new": offer.units_per_day,
+        "offer_id": offer.id, "first": month_start(today),
+    }
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.rowcount
+
+
+def iter_free_capacity(offer_ids, start: date, end: date):
+    """Yield (offer_id, date, capacity - reserved - booked) for stored nights in [start, end)."""
+    months = OfferInventoryMonth.objects.filter(
+        offer_id__in=offer_ids, month__gte=month_start(start), month__lt=end
+    ).values_list("offer_id", "month", "capacity", "reserved", "booked")
+    for offer_id, month, capacity, reserved, booked in months:
+        for i, (c, r, b) in enumerate(zip(capacity, reserved, booked)):
+            d = month + timedelta(days=i)
+            if start <= d < end:
+                yield offer_id, d, c - r - b
+
+
+def snapshot(offer: OwnerOffer, start: date, end: date) -> dict[date, tuple[int, int, int]]:
+    """Monthly counterpart of inventory.inventory_snapshot."""
+    out = {}
+    months = OfferInventoryMonth.objects.filter(offer=offer, month__gte=month_start(start), month__lt=end)
+    for month, capacity, reserved, booked in months.values_list("month", "capacity", "reserved", "booked"):
+        for i, counts in enumerate(zip(capacity, reserved, booked)):
+            d = month + timedelta(days=i)
+            if start <= d < end:
+                out[d] = counts
+    return out
+
+
+_STAY_NIGHTS = f"""
+    FROM {TABLE} m
+    CROSS JOIN LATERAL unnest(m.capacity, m.reserved, m.booked) WITH ORDINALITY AS t(c, r, b, i)
+    WHERE m.offer_id = {OwnerOffer._meta.db_table}.id
+      AND m.month >= %s AND m.month < %s
+      AND m.month + (t.i::int - 1) >= %s AND m.month + (t.i::int - 1) < %s
+"""
+
+
+def availability_annotations(check_in: date, check_out: date, units: int) -> dict:
+    """`short` and `seeded_nights` annotations for OwnerOffer querysets (see eligibility.filter_available)."""
+    params = [month_start(check_in), check_out, check_in, check_out]
+    return {
+        "short": RawSQL(
+            f"EXISTS (SELECT 1 {_STAY_NIGHTS} AND t.c < t.r + t.b + %s)", params + [units],
+            output_field=BooleanField(),
+        ),
+        "seeded_nights": RawSQL(f"(SELECT count(*) {_STAY_NIGHTS})", params, output_field=IntegerField()),
+    }
@@ -1,8 +1,18 @@
 from __future__ import annotations
+import logging
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from datetime import timedelta
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
-from core.models import OutboundMessage, MessageChannel, MessageStatus
+from core.models import Booking, OutboundMessage, MessageChannel, MessageStatus
+from .http import HttpError, http_client
+from .outbox import subscriber
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -35,73 +45,255 @@ class StubSMS(SmsProvider):
         return SendResult(ok=True, channel="sms", provider_message_id=f"stub-sms-{int(timezone.now().timestamp())}")
 
 
+def _failure(channel: str, response) -> SendResult:
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    error = body.get("error")
+    message = error.get("message") if isinstance(error, dict) else body.get("message")
+    return SendResult(ok=False, channel=channel, error_code=f"http_{response.status_code}", error_message=message or "")
+
+
+class WhatsAppCloud(WhatsAppProvider):
+    """WhatsApp Cloud API template messages."""
+
+    def send_template(self, *, to_e164: str, template_name: str, variables: dict) -> SendResult:
+        url = f"https://graph.facebook.com/v19.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
+        body = {
+            "messaging_product": "whatsapp",
+            "to": to_e164.lstrip("+"),
+            "type": "template",
+            "template": {
+                "name": template_name,
+                "language": {"code": settings.WHATSAPP_TEMPLATE_LANGUAGE},
+                "components": [{
+                    "type": "body",
+                    "parameters": [{"type": "text", "text": str(v)} for v in variables.values()],
+                }],
+            },
+        }
+        try:
+            r = http_client.post(url, json=body, headers={"Authorization": f"Bearer {settings.WHATSAPP_CLOUD_TOKEN}"})
+        except HttpError as e:
+            return SendResult(ok=False, channel="whatsapp", error_code=type(e).__name__, error_message=str(e))
+        if not r.ok:
+            return _failure("whatsapp", r)
+        return SendResult(ok=True, channel="whatsapp", provider_message_id=r.json()["messages"][0]["id"])
+
+
+class TermiiSMS(SmsProvider):
+    def send_text(self, *, to_e164: str, text: str) -> SendResult:
+        body = {
+            "api_key": settings.TERMII_API_KEY,
+            "to": to_e164.lstrip("+"),
+            "from": settings.TERMII_SENDER_ID,
+            "sms": text,
+            "type": "plain",
+            "channel": "dnd",
+        }
+        try:
+            r = http_client.post("https://api.ng.termii.com/api/sms/send", json=body)
+        except HttpError as e:
+            return SendResult(ok=False, channel="sms", error_code=type(e).__name__, error_message=str(e))
+        if not r.ok:
+            return _failure("sms", r)
+        return SendResult(ok=True, channel="sms", provider_message_id=str(r.json().get("message_id", "")))
+
+
 def get_whatsapp_provider() -> WhatsAppProvider:
-    if settings.WHATSAPP_PROVIDER == "stub":
-        return StubWhatsApp()
+    if settings.WHATSAPP_PROVIDER == "whatsapp_cloud":
+        return WhatsAppCloud()
     return StubWhatsApp()
 
 
 def get_sms_provider() -> SmsProvider:
-    if settings.SMS_PROVIDER == "stub":
-        return StubSMS()
+    if settings.SMS_PROVIDER == "termii":
+        return TermiiSMS()
     return StubSMS()
 
 
-def send_otp_with_fallback(*, booking, otp, to_e164: str, property_name: str, check_in_iso: str):
-    wa = get_whatsapp_provider()
-    sms = get_sms_provider()
+def queue_otp(*, booking, otp, to_e164: str, property_name: str, check_in_iso: str) -> OutboundMessage:
+    """
+    Queue the OTP for delivery and return at once; MessageDispatcher sends it (WhatsApp
+    first, SMS once WhatsApp has used up its attempts). Messages still queued for an
+    earlier code of the same OTP are dropped, since that code is no longer valid.
+    """
+    OutboundMessage.objects.filter(
+        otp=otp, status=MessageStatus.QUEUED
+    ).update(status=MessageStatus.FAILED, error_code="superseded", updated_at=timezone.now())
 
-    template = "stayflex_otp"
     variables = {
         "otp": otp.otp_code,
         "property": property_name,
         "check_in": check_in_iso,
         "booking": str(booking.id),
     }
-
-    wa_msg = OutboundMessage.objects.create(
+    sms_text = f"StayFlex OTP: {otp.otp_code}. Property: {property_name}. Check-in: {check_in_iso}."
+    return OutboundMessage.objects.create(
         booking=booking,
         otp=otp,
         to_phone_e164=to_e164,
         channel=MessageChannel.WHATSAPP,
         provider=settings.WHATSAPP_PROVIDER,
-        template_name=template,
-        payload={"variables": variables},
+        template_name="stayflex_otp",
+        payload={"variables": variables, "fallback_text": sms_text},
         status=MessageStatus.QUEUED,
     )
 
-    wa_res = wa.send_template(to_e164=to_e164, template_name=template, variables=variables)
-    if wa_res.ok:
-        wa_msg.status = MessageStatus.SENT
-        wa_msg.provider_message_id = wa_res.provider_message_id
-        wa_msg.save(update_fields=["status", "provider_message_id", "updated_at"])
-        return {"delivered_via": "whatsapp"}
 
-    wa_msg.status = MessageStatus.FAILED
-    wa_msg.error_code = wa_res.error_code
-    wa_msg.error_message = wa_res.error_message
-    wa_msg.save(update_fields=["status", "error_code", "error_message", "updated_at"])
+BOOKING_DECISIONS = {"owner_confirmed": "confirmed", "owner_declined": "declined"}
 
-    sms_text = f"StayFlex OTP: {otp.otp_code}. Property: {property_name}. Check-in: {check_in_iso}."
-    sms_msg = OutboundMessage.objects.create(
-        booking=booking,
-        otp=otp,
-        to_phone_e164=to_e164,
-        channel=MessageChannel.SMS,
-        provider=settings.SMS_PROVIDER,
-        payload={"text": sms_text},
-        status=MessageStatus.QUEUED,
-    )
 
-    sms_res = sms.send_text(to_e164=to_e164, text=sms_text)
-    if sms_res.ok:
-        sms_msg.status = MessageStatus.SENT
-        sms_msg.provider_message_id = sms_res.provider_message_id
-        sms_msg.save(update_fields=["status", "provider_message_id", "updated_at"])
-        return {"delivered_via": "sms"}
-
-    sms_msg.status = MessageStatus.FAILED
-    sms_msg.error_code = sms_res.error_code
-    sms_msg.error_message = sms_res.error_message
-    sms_msg.save(update_fields=["status", "error_code", "error_message", "updated_at"])
-    return {"delivered_via": "none"}
+@subscriber("audit")
+def queue_booking_decisions(events):
+    """Queue a message to the customer when the owner confirms or declines their booking."""
+    decisions = {
+        e.payload["entity_id"]: BOOKING_DECISIONS[e.payload["action_type"]]
+        for e in events
+        if e.payload["entity_type"] == "booking" and e.payload["action_type"] in BOOKING_DECISIONS
+    }
+    if not decisions:
+        return
+    messages = []
+    for booking in Booking.objects.filter(id__in=decisions).select_related("property", "user__userprofile"):
+        phone = getattr(getattr(booking.user, "userprofile", None), "phone_e164", "")
+        if not phone:
+            continue
+        decision = decisions[str(booking.id)]
+        check_in = booking.check_in.isoformat()
+        messages.append(
+            OutboundMessage(
+                booking=booking,
+                to_phone_e164=phone,
+                channel=MessageChannel.WHATSAPP,
+                provider=settings.WHATSAPP_PROVIDER,
+                template_name=f"stayflex_booking_{decision}",
+                payload={
+                    "variables": {"property": booking.property.name, "check_in": check_in, "booking": str(booking.id)},
+                    "fallback_text": f"StayFlex: your booking at {booking.property.name} "
+                                     f"for {check_in} was {decision}.",
+                },
+                status=MessageStatus.QUEUED,
+            )
+        )
+    OutboundMessage.objects.bulk_create(messages)
+
+
+def _send(message: OutboundMessage) -> SendResult:
+    """Runs on a pool thread: provider call only, no database access."""
+    try:
+        if message.channel == MessageChannel.WHATSAPP:
+            return get_whatsapp_provider().send_template(
+                to_e164=message.to_phone_e164,
+                template_name=message.template_name,
+                variables=message.payload["variables"],
+            )
+        return get_sms_provider().send_text(to_e164=message.to_phone_e164, text=message.payload["text"])
+    except Exception as e:
+        logger.exception("Provider call failed for message %s", message.id)
+        return SendResult(ok=False, channel=message.channel, error_code="exception", error_message=repr(e))
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(settings.MESSAGE_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 300))
+
+
+class MessageDispatcher:
+    """
+    Drains QUEUED OutboundMessage rows. Each channel has its own thread pool sized by
+    MESSAGE_CONCURRENCY, and only as many messages as it has free workers are claimed for
+    it, so a slow provider never ties up the other. Claims are leases (status SENDING,
+    locked_until): a dispatcher that dies mid-send leaves rows another one picks up after
+    MESSAGE_SEND_TIMEOUT_SECONDS. Provider calls run on the pool threads; all database
+    writes happen on the dispatcher's thread.
+    """
+
+    def __init__(self, concurrency: dict[str, int] | None = None):
+        self.concurrency = concurrency or settings.MESSAGE_CONCURRENCY
+        self.pools = {
+            channel: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"send-{channel}")
+            for channel, n in self.concurrency.items()
+        }
+        self.in_flight: dict = {}  # future -> message
+
+    def _claim(self, channel: str, limit: int) -> list[OutboundMessage]:
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(
+                OutboundMessage.objects.select_for_update(skip_locked=True)
+                .filter(channel=channel)
+                .filter(
+                    Q(status=MessageStatus.QUEUED, next_attempt_at__lte=now)
+                    | Q(status=MessageStatus.SENDING, locked_until__lt=now)
+                )
+                .order_by("next_attempt_at")[:limit]
+            )
+            OutboundMessage.objects.filter(id__in=[m.id for m in messages]).update(
+                status=MessageStatus.SENDING,
+                attempts=F("attempts") + 1,
+                locked_until=now + timedelta(seconds=settings.MESSAGE_SEND_TIMEOUT_SECONDS),
+                updated_at=now,
+            )
+        for m in messages:
+            m.attempts += 1
+        return messages
+
+    def _record(self, message: OutboundMessage, result: SendResult):
+        now = timezone.now()
+        sending = OutboundMessage.objects.filter(id=message.id, status=MessageStatus.SENDING)
+        if result.ok:
+            sending.update(
+                status=MessageStatus.SENT, provider_message_id=result.provider_message_id,
+                error_code="", error_message="", locked_until=None, updated_at=now,
+            )
+            return
+        errors = {"error_code": result.error_code, "error_message": result.error_message, "locked_until": None}
+        if message.attempts < settings.MESSAGE_MAX_ATTEMPTS[message.channel]:
+            sending.update(
+                status=MessageStatus.QUEUED, next_attempt_at=now + _backoff(message.attempts), updated_at=now, **errors
+            )
+            return
+        with transaction.atomic():
+            failed = sending.update(status=MessageStatus.FAILED, updated_at=now, **errors)
+            if failed and message.channel == MessageChannel.WHATSAPP and message.payload.get("fallback_text"):
+                OutboundMessage.objects.create(
+                    booking_id=message.booking_id,
+                    otp_id=message.otp_id,
+                    to_phone_e164=message.to_phone_e164,
+                    channel=MessageChannel.SMS,
+                    provider=settings.SMS_PROVIDER,
+                    payload={"text": message.payload["fallback_text"]},
+                    status=MessageStatus.QUEUED,
+                )
+
+    def step(self, timeout: float = 0) -> int:
+        """Record finished sends, then top every pool up with new claims; returns how many were claimed."""
+        if self.in_flight:
+            finished, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in finished:
+                self._record(self.in_flight.pop(future), future.result())
+        busy = Counter(m.channel for m in self.in_flight.values())
+        claimed = 0
+        for channel, n in self.concurrency.items():
+            free = n - busy[channel]
+            if free <= 0:
+                continue
+            for message in self._claim(channel, free):
+                self.in_flight[self.pools[channel].submit(_send, message)] = message
+                claimed += 1
+        return claimed
+
+    def drain(self) -> int:
+        """Send until nothing is due or in flight; returns the number of send attempts."""
+        attempts = self.step()
+        while self.in_flight:
+            attempts += self.step(timeout=1)
+        return attempts
+
+    def close(self):
+        for future, message in list(self.in_flight.items()):
+            self._record(message, future.result())
+        self.in_flight.clear()
+        for pool in self.pools.values():
+            pool.shutdown()
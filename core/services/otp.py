@@ -2,7 +2,8 @@ from __future__ import annotations
 from datetime import timedelta
 from django.utils import timezone
 from django.db import transaction
-from core.models import OTPVerification, Booking, VoucherStatus, BookingStatus, Payout, PayoutStatus, AuditLog
+from core.models import OTPVerification, Booking, VoucherStatus, BookingStatus, Payout, PayoutStatus
+from .outbox import audit
 from .codes import generate_otp_code
 
 
@@ -70,7 +71,7 @@ def verify_otp_and_complete(*, booking: Booking, otp_code: str, actor_user):
         defaults={"owner": booking.property.owner, "amount_kobo": amount, "status": PayoutStatus.PENDING},
     )
 
-    AuditLog.objects.create(
+    audit(
         actor=actor_user,
         action_type="otp_verified",
         entity_type="booking",
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+from core.models import AuditLog, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Events are plain rows appended in the caller's transaction, so they commit or roll
+# back with the business change. drain_batch() claims pending rows with SKIP LOCKED,
+# hands each topic's events to its subscribers as one batch and marks them processed
+# in the same transaction: database subscribers run exactly once, external ones at
+# least once (they get the event's dedupe_key to drop repeats). A failing event is
+# retried on its own with backoff and dead-lettered after OUTBOX_MAX_ATTEMPTS.
+
+_SUBSCRIBERS: dict[str, list] = defaultdict(list)
+
+MAX_BACKOFF = timedelta(hours=1)
+
+
+def subscriber(topic: str):
+    """Register fn(events: list[OutboxEvent]) for a topic."""
+    def decorator(fn):
+        _SUBSCRIBERS[topic].append(fn)
+        return fn
+    return decorator
+
+
+def emit(topic: str, payload: dict, *, dedupe_key: str | None = None):
+    """Append an event to the outbox; a repeated dedupe_key is dropped."""
+    event = OutboxEvent(topic=topic, payload=payload)
+    if dedupe_key:
+        event.dedupe_key = dedupe_key
+    OutboxEvent.objects.bulk_create([event], ignore_conflicts=True)
+
+
+def emit_many(topic: str, payloads: list[dict]):
+    OutboxEvent.objects.bulk_create([OutboxEvent(topic=topic, payload=p) for p in payloads])
+
+
+def audit_payload(actor, action_type: str, entity_type: str, entity_id, meta_data: dict | None = None) -> dict:
+    return {
+        "actor_id": getattr(actor, "id", actor),
+        "action_type": action_type,
+        "entity_type": entity_type,
+        "entity_id": str(entity_id),
+        "meta_data": meta_data or {},
+        "occurred_at": timezone.now(),
+    }
+
+
+def audit(actor, action_type: str, entity_type: str, entity_id, meta_data: dict | None = None):
+    """Outbox replacement for AuditLog.objects.create(...)."""
+    emit("audit", audit_payload(actor, action_type, entity_type, entity_id, meta_data))
+
+
+@subscriber("audit")
+def write_audit_logs(events: list[OutboxEvent]):
+    AuditLog.objects.bulk_create(
+        [
+            AuditLog(
+                actor_id=e.payload["actor_id"],
+                action_type=e.payload["action_type"],
+                entity_type=e.payload["entity_type"],
+                entity_id=e.payload["entity_id"],
+                meta_data=e.payload["meta_data"],
+                created_at=e.payload["occurred_at"],
+            )
+            for e in events
+        ]
+    )
+
+
+def _backoff(attempts: int) -> timedelta:
+    return min(timedelta(seconds=2 ** attempts), MAX_BACKOFF)
+
+
+def _deliver(topic: str, events: list[OutboxEvent]):
+    with transaction.atomic():
+        for fn in _SUBSCRIBERS.get(topic, []):
+            fn(events)
+
+
+def _deliver_group(topic: str, group: list[OutboxEvent]) -> dict[int, str]:
+    """
+    Deliver a topic's events as one batch; if that fails, retry them one by one so a
+    single poison event only fails itself. Returns {event_id: error}.
+    """
+    if len(group) > 1:
+        try:
+            _deliver(topic, group)
+            return {}
+        except Exception:
+            logger.warning("Outbox batch of %d %s event(s) failed; retrying one by one", len(group), topic)
+    errors = {}
+    for e in group:
+        try:
+            _deliver(topic, [e])
+        except Exception as exc:
+            logger.exception("Outbox delivery failed for %s event %d", topic, e.id)
+            errors[e.id] = repr(exc)
+    return errors
+
+
+def drain_batch(batch_size: int = 500) -> int:
+    """
+    Deliver one batch of due events; returns how many were claimed. A failed event
+    backs off and is retried; after OUTBOX_MAX_ATTEMPTS it is dead-lettered (dead_at
+    set) and left for inspection.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, dead_at__isnull=True, available_at__lte=now)
+            .order_by("available_at", "id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        by_topic = defaultdict(list)
+        for e in events:
+            by_topic[e.topic].append(e)
+
+        errors = {}
+        for topic, group in by_topic.items():
+            errors.update(_deliver_group(topic, group))
+
+        OutboxEvent.objects.filter(id__in=[e.id for e in events if e.id not in errors]).update(
+            processed_at=timezone.now()
+        )
+        for e in events:
+            if e.id not in errors:
+                continue
+            if e.attempts + 1 >= settings.OUTBOX_MAX_ATTEMPTS:
+                logger.error("Outbox %s event %d dead-lettered after %d attempts", e.topic, e.id, e.attempts + 1)
+                changes = {"dead_at": timezone.now()}
+            else:
+                changes = {"available_at": now + _backoff(e.attempts)}
+            OutboxEvent.objects.filter(id=e.id).update(
+                attempts=F("attempts") + 1, last_error=errors[e.id][:2000], **changes
+            )
+    return len(events)
+
+
+def purge_processed(older_than: timedelta | None = None) -> int:
+    cutoff = timezone.now() - (older_than or timedelta(days=settings.OUTBOX_RETENTION_DAYS))
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
+
+
+def stats(window: timedelta = timedelta(minutes=5)) -> dict:
+    """
+    Per topic: queue depth (pending, retrying), age of the oldest pending event,
+    dead-lettered events, and throughput and apply lag (processed_at - created_at)
+    over the last `window`.
+    """
+    now = timezone.now()
+    topics: dict = defaultdict(dict)
+    for row in (
+        OutboxEvent.objects.filter(processed_at__isnull=True, dead_at__isnull=True)
+        .values("topic")
+        .annotate(pending=Count("id"), retrying=Count("id", filter=Q(attempts__gt=0)), oldest=Min("created_at"))
+    ):
+        topics[row["topic"]].update(
+            pending=row["pending"],
+            retrying=row["retrying"],
+            oldest_pending_seconds=round((now - row["oldest"]).total_seconds(), 1),
+        )
+    for row in OutboxEvent.objects.filter(dead_at__isnull=False).values("topic").annotate(dead=Count("id")):
+        topics[row["topic"]]["dead"] = row["dead"]
+    for row in (
+        OutboxEvent.objects.filter(processed_at__gte=now - window)
+        .values("topic")
+        .annotate(processed=Count("id"), lag=Avg(F("processed_at") - F("created_at")),
+                  max_lag=Max(F("processed_at") - F("created_at")))
+    ):
+        topics[row["topic"]].update(
+            processed_recently=row["processed"],
+            avg_lag_seconds=round(row["lag"].total_seconds(), 3),
+            max_lag_seconds=round(row["max_lag"].total_seconds(), 3),
+        )
+    return {"window_seconds": window.total_seconds(), "topics": dict(topics)}
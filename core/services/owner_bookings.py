@@ -0,0 +1,110 @@
+from __future__ import annotations
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from core.models import Booking, BookingStatus, OwnerOffer, Voucher, VoucherStatus
+from .inventory import (
+    InventoryError, convert_reserved_bulk, lock_inventory, nightly_totals, release_reserved_bulk
+)
+from .outbox import audit_payload, emit_many
+
+CONFIRM = "confirm"
+DECLINE = "decline"
+DECLINED_REASON = "owner_declined"
+
+_BULK_OPS = {CONFIRM: convert_reserved_bulk, DECLINE: release_reserved_bulk}
+
+
+def _stay(offers, booking: Booking):
+    return offers[booking.offer_id], booking.check_in, booking.check_out, booking.reserved_units
+
+
+def _apply_inventory(offers, action: str, bookings: list[Booking]) -> dict:
+    """
+    Run one set-based inventory update for all bookings of an offer; if it fails, retry
+    them one by one so a single drifted booking only fails itself. Returns {booking_id: error}.
+    """
+    fn = _BULK_OPS[action]
+    if len(bookings) > 1:
+        try:
+            with transaction.atomic():
+                fn(_stay(offers, b) for b in bookings)
+            return {}
+        except InventoryError:
+            pass
+    errors = {}
+    for booking in bookings:
+        try:
+            with transaction.atomic():
+                fn([_stay(offers, booking)])
+        except InventoryError as e:
+            errors[booking.id] = str(e)
+    return errors
+
+
+@transaction.atomic
+def confirm_or_decline_bookings(owner, actions: list[tuple]) -> list[dict]:
+    """
+    Apply (booking_id, "confirm" | "decline") pairs for one owner in a single transaction.
+    Bookings are locked in id order and every inventory night they touch is locked in
+    (offer, date) order before any write, so two overlapping batches (or a batch and a
+    single confirm/decline) queue instead of deadlocking. Inventory changes are grouped
+    per offer and action. Returns one {booking_id, action, outcome[, detail]} per input,
+    in input order; outcome is one of confirmed, declined, not_found, not_pending,
+    inventory_conflict.
+    """
+    ids = [booking_id for booking_id, _ in actions]
+    bookings = {
+        b.id: b
+        for b in Booking.objects.select_for_update(of=("self",))
+        .filter(id__in=ids, property__owner=owner)
+        .order_by("id")
+    }
+    pending = {b.id: b for b in bookings.values() if b.status == BookingStatus.PENDING}
+    offers = OwnerOffer.objects.in_bulk({b.offer_id for b in pending.values()})
+
+    groups = defaultdict(list)
+    for booking_id, action in actions:
+        if booking_id in pending:
+            groups[(pending[booking_id].offer_id, action)].append(pending[booking_id])
+
+    lock_inventory(nightly_totals(_stay(offers, b) for b in pending.values()))
+
+    errors = {}
+    for (_, action), group in sorted(groups.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        errors.update(_apply_inventory(offers, action, group))
+
+    done = {CONFIRM: [], DECLINE: []}
+    for booking_id, action in actions:
+        if booking_id in pending and booking_id not in errors:
+            done[action].append(pending[booking_id])
+
+    now = timezone.now()
+    if done[CONFIRM]:
+        Booking.objects.filter(id__in=[b.id for b in done[CONFIRM]]).update(
+            status=BookingStatus.CONFIRMED, updated_at=now
+        )
+    if done[DECLINE]:
+        Booking.objects.filter(id__in=[b.id for b in done[DECLINE]]).update(
+            status=BookingStatus.CANCELLED, cancelled_reason=DECLINED_REASON, updated_at=now
+        )
+        Voucher.objects.filter(id__in=[b.voucher_id for b in done[DECLINE]]).update(status=VoucherStatus.ACTIVE)
+    emit_many(
+        "audit",
+        [audit_payload(owner, "owner_confirmed", "booking", b.id, {"bulk": True}) for b in done[CONFIRM]]
+        + [audit_payload(owner, "owner_declined", "booking", b.id, {"bulk": True}) for b in done[DECLINE]],
+    )
+
+    results = []
+    for booking_id, action in actions:
+        result = {"booking_id": booking_id, "action": action}
+        if booking_id not in bookings:
+            result["outcome"] = "not_found"
+        elif booking_id not in pending:
+            result.update(outcome="not_pending", detail=f"Booking is {bookings[booking_id].status}")
+        elif booking_id in errors:
+            result.update(outcome="inventory_conflict", detail=errors[booking_id])
+        else:
+            result["outcome"] = "confirmed" if action == CONFIRM else "declined"
+        results.append(result)
+    return results
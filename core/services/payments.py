@@ -0,0 +1,194 @@
+from __future__ import annotations
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from core.models import JobCheckpoint, OutboxEvent, Payment, PaymentStatus, Voucher, VoucherStatus
+from .cursors import decode_cursor, encode_cursor
+from .outbox import emit, subscriber
+from .paystack import PaystackError, TransactionNotFound, verify_transaction
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_TOPIC = "paystack.webhook"
+SUCCESS = "success"
+FAILED = "failed"
+
+
+def verify_outcome(gateway_status: str | None) -> str | None:
+    """Map a transaction/verify status to SUCCESS, FAILED or None (still open)."""
+    if gateway_status == "success":
+        return SUCCESS
+    if gateway_status in ("failed", "abandoned"):
+        return FAILED
+    return None
+
+
+def enqueue_webhook(payload: dict):
+    """
+    Append a verified Paystack webhook to the outbox. Redeliveries of the same event
+    (same event type and transaction) share a dedupe_key and are dropped on insert.
+    """
+    data = payload.get("data") or {}
+    identity = data.get("id") or data.get("reference")
+    emit(WEBHOOK_TOPIC, payload, dedupe_key=f"paystack:{payload.get('event')}:{identity}"[:128])
+
+
+def _vouchers_of(payments: list[Payment]):
+    """Vouchers paid for by these payments: the single voucher, or every voucher of a bulk order."""
+    return Voucher.objects.filter(
+        Q(id__in=[p.voucher_id for p in payments if p.voucher_id])
+        | Q(order_id__in=[p.order_id for p in payments if p.order_id])
+    )
+
+
+@transaction.atomic
+def apply_gateway_outcomes(
+    outcomes: dict[str, tuple[str | None, dict]], *, expire_failed_vouchers: bool = False
+) -> dict[str, int]:
+    """
+    Apply {reference: (outcome, gateway payload)} in one transaction, outcome being
+    SUCCESS, FAILED or None (record the payload only). SUCCESS moves any payment to
+    SUCCESSFUL and activates its CREATED voucher(s); FAILED only moves PENDING payments
+    and expires the still-CREATED vouchers of bulk orders (of every payment with
+    expire_failed_vouchers). A SUCCESS
+    for a payment already FAILED (e.g. by reconcile) also reactivates the vouchers that
+    failure expired, as long as they are still within their validity window.
+    Payments are locked in reference order; unknown references are skipped.
+    """
+    payments = list(
+        Payment.objects.select_for_update(of=("self",))
+        .filter(reference__in=list(outcomes))
+        .order_by("reference")
+    )
+    succeeded, failed, revived = [], [], []
+    for payment in payments:
+        outcome, payment.gateway_payload = outcomes[payment.reference]
+        if outcome == SUCCESS and payment.status != PaymentStatus.SUCCESSFUL:
+            if payment.status == PaymentStatus.FAILED:
+                revived.append(payment)
+            payment.status = PaymentStatus.SUCCESSFUL
+            succeeded.append(payment)
+        elif outcome == FAILED and payment.status == PaymentStatus.PENDING:
+            payment.status = PaymentStatus.FAILED
+            failed.append(payment)
+        payment.updated_at = timezone.now()
+    Payment.objects.bulk_update(payments, ["status", "gateway_payload", "updated_at"])
+    _vouchers_of(succeeded).filter(status=VoucherStatus.CREATED).update(status=VoucherStatus.ACTIVE)
+    if revived:
+        reactivated = _vouchers_of(revived).filter(
+            status=VoucherStatus.EXPIRED, valid_until__gt=timezone.now()
+        ).update(status=VoucherStatus.ACTIVE)
+        logger.warning(
+            "Success for failed payment(s) %s; reactivated %d voucher(s)",
+            ", ".join(p.reference for p in revived), reactivated,
+        )
+    expiring = failed if expire_failed_vouchers else [p for p in failed if p.order_id]
+    _vouchers_of(expiring).filter(status=VoucherStatus.CREATED).update(status=VoucherStatus.EXPIRED)
+
+    unknown = set(outcomes) - {p.reference for p in payments}
+    if unknown:
+        logger.warning("Gateway outcome for unknown payment reference(s): %s", ", ".join(sorted(unknown)))
+    return {"succeeded": len(succeeded), "failed": len(failed), "unknown": len(unknown)}
+
+
+@subscriber(WEBHOOK_TOPIC)
+def apply_paystack_webhooks(events: list[OutboxEvent]):
+    """
+    Coalesce a batch of webhook events into one transition per reference: a
+    charge.success anywhere in the batch wins, otherwise the last event decides
+    (any other event fails a pending payment, as the inline webhook handler did).
+    """
+    outcomes: dict[str, tuple[str | None, dict]] = {}
+    for e in sorted(events, key=lambda e: e.id):
+        reference = (e.payload.get("data") or {}).get("reference")
+        if not reference:
+            continue
+        outcome = SUCCESS if e.payload.get("event") == "charge.success" else FAILED
+        if outcomes.get(reference, (None,))[0] == SUCCESS and outcome != SUCCESS:
+            continue
+        outcomes[reference] = (outcome, e.payload)
+    if outcomes:
+        apply_gateway_outcomes(outcomes)
+
+
+RECONCILE_JOB = "reconcile_payments"
+
+
+@dataclass
+class ReconcileResult:
+    checked: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    still_pending: int = 0
+    errors: int = 0  # gateway unreachable or unexpected answer; retried next pass
+    batches: int = 0
+    finished: bool = False  # reached the end of the pending set; the next run starts over
+
+
+def _verify(payment: Payment, abandon_before) -> tuple[str | None, dict] | None:
+    """Runs on a pool thread: gateway call only. None means no answer (skip this payment)."""
+    try:
+        data = verify_transaction(payment.reference)
+    except TransactionNotFound as e:
+        if payment.created_at < abandon_before:
+            return FAILED, {"reconciled": "not_found", "message": str(e)}
+        return None, payment.gateway_payload
+    except PaystackError as e:
+        logger.warning("Could not verify payment %s: %s", payment.reference, e)
+        return None
+    return verify_outcome(data.get("status")), data
+
+
+def reconcile_pending_payments(
+    *, older_than: timedelta | None = None, batch_size: int = 100, workers: int | None = None,
+    max_batches: int | None = None,
+) -> ReconcileResult:
+    """
+    Verify PENDING payments created before now - older_than against Paystack, oldest
+    first. Each batch is verified concurrently (bounded by `workers`), then applied in
+    one transaction together with the job checkpoint, so an interrupted run resumes
+    after the last applied batch and concurrent runs take batches in turn. Payments the gateway never saw are failed once older
+    than PAYMENT_ABANDON_HOURS; failed payments expire their CREATED vouchers.
+    """
+    now = timezone.now()
+    cutoff = now - (older_than or timedelta(minutes=settings.PAYMENT_RECONCILE_AFTER_MINUTES))
+    abandon_before = now - timedelta(hours=settings.PAYMENT_ABANDON_HOURS)
+    JobCheckpoint.objects.get_or_create(name=RECONCILE_JOB)
+    result = ReconcileResult()
+
+    with ThreadPoolExecutor(max_workers=workers or settings.PAYMENT_RECONCILE_WORKERS) as pool:
+        while max_batches is None or result.batches < max_batches:
+            # The checkpoint row stays locked from reading the cursor to saving the next
+            # one, gateway calls included, so a concurrent run waits and then resumes
+            # after this batch instead of verifying the same payments.
+            with transaction.atomic():
+                checkpoint = JobCheckpoint.objects.select_for_update().get(name=RECONCILE_JOB)
+                qs = Payment.objects.filter(status=PaymentStatus.PENDING, created_at__lt=cutoff)
+                if checkpoint.cursor:
+                    created_at, pk = decode_cursor(checkpoint.cursor, 2)
+                    qs = qs.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+                batch = list(qs.order_by("created_at", "id")[:batch_size])
+                if not batch:
+                    checkpoint.cursor = ""
+                    checkpoint.save(update_fields=["cursor", "updated_at"])
+                    result.finished = True
+                    break
+
+                answers = pool.map(lambda p: (p.reference, _verify(p, abandon_before)), batch)
+                outcomes = {ref: answer for ref, answer in answers if answer is not None}
+                counts = apply_gateway_outcomes(outcomes, expire_failed_vouchers=True) if outcomes else {}
+                checkpoint.cursor = encode_cursor(batch[-1].created_at.isoformat(), batch[-1].id)
+                checkpoint.save(update_fields=["cursor", "updated_at"])
+
+            result.batches += 1
+            result.checked += len(batch)
+            result.succeeded += counts.get("succeeded", 0)
+            result.failed += counts.get("failed", 0)
+            result.errors += len(batch) - len(outcomes)
+            result.still_pending += sum(1 for outcome, _ in outcomes.values() if outcome is None)
+    return result
@@ -2,15 +2,20 @@ from __future__ import annotations
 import hmac
 import hashlib
 import json
-import requests
 from django.conf import settings
+from .http import HttpError, http_client
 
 
 class PaystackError(Exception):
     pass
 
 
-BASE = "https://api.paystack.co"
+class TransactionNotFound(PaystackError):
+    """Paystack has no transaction for the reference (checkout never opened)."""
+
+
+def _url(path: str) -> str:
+    return f"{settings.PAYSTACK_BASE_URL.rstrip('/')}{path}"
 
 
 def _headers():
@@ -19,27 +24,42 @@ def _headers():
     return {"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}", "Content-Type": "application/json"}
 
 
+def _json(response) -> dict:
+    try:
+        return response.json()
+    except ValueError:
+        raise PaystackError(f"Paystack returned HTTP {response.status_code}")
+
+
 def initialize_transaction(*, email: str, amount_kobo: int, reference: str, metadata: dict) -> dict:
-    r = requests.post(
-        f"{BASE}/transaction/initialize",
-        headers=_headers(),
-        data=json.dumps({
-            "email": email,
-            "amount": amount_kobo,
-            "reference": reference,
-            "metadata": metadata,
-        }),
-        timeout=25,
-    )
-    data = r.json()
+    # Not retried after the request was sent: a repeat would be rejected as a duplicate reference
+    try:
+        r = http_client.post(
+            _url("/transaction/initialize"),
+            headers=_headers(),
+            data=json.dumps({
+                "email": email,
+                "amount": amount_kobo,
+                "reference": reference,
+                "metadata": metadata,
+            }),
+        )
+    except HttpError as e:
+        raise PaystackError(str(e)) from e
+    data = _json(r)
     if not data.get("status"):
         raise PaystackError(data.get("message") or "Paystack init failed")
     return data["data"]  # includes authorization_url
 
 
 def verify_transaction(reference: str) -> dict:
-    r = requests.get(f"{BASE}/transaction/verify/{reference}", headers=_headers(), timeout=25)
-    data = r.json()
+    try:
+        r = http_client.get(_url(f"/transaction/verify/{reference}"), headers=_headers())
+    except HttpError as e:
+        raise PaystackError(str(e)) from e
+    data = _json(r)
+    if r.status_code in (400, 404) and not data.get("status"):
+        raise TransactionNotFound(data.get("message") or "Transaction reference not found")
     if not data.get("status"):
         raise PaystackError(data.get("message") or "Paystack verify failed")
     return data["data"]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date, datetime
+from django.utils import timezone
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+ALL_DAYS_MASK = (1 << 7) - 1
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """
+    Offer-independent VoucherProduct rules in a form that is cheap to evaluate:
+    blackout dates as a bitset over day ordinals (bit i => ordinal blackout_base + i),
+    allowed days as a Mon..Sun bitmask, lead time as a plain hour threshold.
+    """
+    blackout_base: int
+    blackout_bits: int
+    allowed_days_mask: int
+    lead_time_hours: int
+    payout_cap_kobo: int
+
+    def is_blackout(self, check_in: date, check_out: date) -> bool:
+        if not self.blackout_bits:
+            return False
+        lo = max(check_in.toordinal() - self.blackout_base, 0)
+        hi = check_out.toordinal() - self.blackout_base
+        if hi <= lo:
+            return False
+        return bool((self.blackout_bits >> lo) & ((1 << (hi - lo)) - 1))
+
+    def allowed_day(self, check_in: date) -> bool:
+        return bool(self.allowed_days_mask >> check_in.weekday() & 1)
+
+    def max_rate_kobo(self, nights: int) -> int:
+        return self.payout_cap_kobo // nights
+
+    def reject_reason(self, check_in: date, check_out: date, now: datetime | None = None) -> str | None:
+        """Voucher-level gates only; None when an offer could still be eligible."""
+        if self.is_blackout(check_in, check_out):
+            return "blackout"
+        if not self.allowed_day(check_in):
+            return "day_not_allowed"
+        if hours_until(check_in, now) < self.lead_time_hours:
+            return "lead_time"
+        return None
+
+
+def hours_until(check_in: date, now: datetime | None = None) -> int:
+    """
+    Whole hours from now until midnight of check_in. For an integer lead time h,
+    check_in >= now + h hours  <=>  h <= hours_until(check_in).
+    """
+    now = now or timezone.now()
+    start = datetime.combine(check_in, datetime.min.time(), tzinfo=timezone.get_current_timezone())
+    return int((start - now).total_seconds() // 3600)
+
+
+def compile_policy(voucher_product) -> CompiledPolicy:
+    ordinals = []
+    for raw in voucher_product.blackout_dates or []:
+        try:
+            ordinals.append(date.fromisoformat(raw).toordinal())
+        except (TypeError, ValueError):
+            continue
+    base = min(ordinals) if ordinals else 0
+    bits = 0
+    for o in ordinals:
+        bits |= 1 << (o - base)
+
+    allowed = voucher_product.allowed_days or []
+    mask = ALL_DAYS_MASK
+    if allowed:
+        mask = 0
+        for i, name in enumerate(WEEKDAYS):
+            if name in allowed:
+                mask |= 1 << i
+
+    return CompiledPolicy(
+        blackout_base=base,
+        blackout_bits=bits,
+        allowed_days_mask=mask,
+        lead_time_hours=voucher_product.lead_time_hours,
+        payout_cap_kobo=voucher_product.payout_cap_kobo,
+    )
+
+
+# Per-process cache: sku -> (updated_at, policy). Keying on updated_at keeps other
+# processes correct after a product edit; invalidate_policy() evicts eagerly here.
+_POLICY_CACHE: dict[str, tuple[datetime | None, CompiledPolicy]] = {}
+
+
+def get_policy(voucher_product) -> CompiledPolicy:
+    stamp = getattr(voucher_product, "updated_at", None)
+    hit = _POLICY_CACHE.get(voucher_product.sku)
+    if hit is not None and stamp is not None and hit[0] == stamp:
+        return hit[1]
+    policy = compile_policy(voucher_product)
+    if stamp is not None:
+        _POLICY_CACHE[voucher_product.sku] = (stamp, policy)
+    return policy
+
+
+def invalidate_policy(sku: str | None = None):
+    if sku is None:
+        _POLICY_CACHE.clear()
+    else:
+        _POLICY_CACHE.pop(sku, None)
+
+
+def policy_snapshot(voucher_product) -> dict:
+    """Frozen copy of the product rules stored on each Voucher at issue time."""
+    vp = voucher_product
+    return {
+        "sku": vp.sku,
+        "city": vp.city,
+        "min_property_score": vp.min_property_score,
+        "max_property_score": vp.max_property_score,
+        "tier_min": vp.tier_min,
+        "tier_max": vp.tier_max,
+        "payout_cap_kobo": vp.payout_cap_kobo,
+        "nights": vp.nights,
+        "validity_days": vp.validity_days,
+        "lead_time_hours": vp.lead_time_hours,
+        "blackout_dates": vp.blackout_dates,
+        "allowed_days": vp.allowed_days,
+    }
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import OfferInventoryDay, OfferInventoryMonth, OwnerOffer, Property, VoucherProduct
+from .services.eligibility_index import sync_offers, sync_product, sync_property
+from .services.policy import invalidate_policy
+from .services.eligibility_cache import bump_days, bump_skus, forget_offer_skus, offer_skus, remember_offer_skus
+from .services.inventory import materialize_inventory, propagate_units_per_day
+
+
+@receiver(post_save, sender=OwnerOffer)
+def index_offer(sender, instance: OwnerOffer, raw: bool = False, **kwargs):
+    if raw:
+        return
+    diff = sync_offers([instance])
+    bump_skus(set(instance.eligible_skus or []) | {sku for sku, _offer_id in diff.stale})
+    remember_offer_skus(instance)
+
+
+@receiver(post_delete, sender=OwnerOffer)
+def unindex_offer(sender, instance: OwnerOffer, **kwargs):
+    # Index rows go with the offer (CASCADE); cached results naming it must go too.
+    bump_skus(instance.eligible_skus or [])
+    forget_offer_skus(instance.pk)
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance: Property, raw: bool = False, **kwargs):
+    if raw:
+        return
+    sync_property(instance)
+    bump_skus(sku for skus in instance.offers.values_list("eligible_skus", flat=True) for sku in skus or [])
+
+
+@receiver(post_save, sender=VoucherProduct)
+def index_product(sender, instance: VoucherProduct, raw: bool = False, **kwargs):
+    if raw:
+        return
+    sync_product(instance)
+    bump_skus([instance.sku])
+
+
+@receiver(post_save, sender=VoucherProduct)
+@receiver(post_delete, sender=VoucherProduct)
+def evict_product_policy(sender, instance: VoucherProduct, **kwargs):
+    invalidate_policy(instance.sku)
+
+
+@receiver(post_save, sender=OfferInventoryDay)
+@receiver(post_delete, sender=OfferInventoryDay)
+def evict_inventory_day(sender, instance: OfferInventoryDay, raw: bool = False, **kwargs):
+    if raw:
+        return
+    bump_days(offer_skus(instance.offer_id), instance.date, instance.date + timedelta(days=1))
+
+
+@receiver(post_save, sender=OfferInventoryMonth)
+@receiver(post_delete, sender=OfferInventoryMonth)
+def evict_inventory_month(sender, instance: OfferInventoryMonth, raw: bool = False, **kwargs):
+    if raw:
+        return
+    bump_days(offer_skus(instance.offer_id), instance.month, instance.month + timedelta(days=len(instance.capacity)))
+
+
+_INVENTORY_FIELDS = ("start_date", "end_date", "units_per_day", "is_active")
+
+
+@receiver(pre_save, sender=OwnerOffer)
+def remember_offer_inventory_fields(sender, instance: OwnerOffer, raw: bool = False, **kwargs):
+    instance._inventory_before = None
+    if raw or instance._state.adding:
+        return
+    instance._inventory_before = OwnerOffer.objects.filter(pk=instance.pk).values(*_INVENTORY_FIELDS).first()
+
+
+@receiver(post_save, sender=OwnerOffer)
+def materialize_offer_inventory(sender, instance: OwnerOffer, created: bool, raw: bool = False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_inventory_before", None)
+    if not created and before is not None:
+        if all(before[f] == getattr(instance, f) for f in _INVENTORY_FIELDS):
+            return
+        if before["units_per_day"] != instance.units_per_day:
+            propagate_units_per_day(instance, before["units_per_day"])
+    materialize_inventory([instance.id])
@@ -0,0 +1,69 @@
+import threading
+import time
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from core.models import IdempotencyKey
+from core.services.idempotency import HEADER, idempotent
+
+
+class FailsFirst(APIView):
+    """Raises on its first call once `release` is set; succeeds afterwards."""
+
+    started = threading.Event()
+    release = threading.Event()
+    calls = 0
+
+    @idempotent("test.fails_first")
+    def post(self, request):
+        cls = type(self)
+        cls.calls += 1
+        if cls.calls == 1:
+            cls.started.set()
+            cls.release.wait(5)
+            raise ValueError("first execution failed")
+        return Response({"call": cls.calls}, status=status.HTTP_201_CREATED)
+
+
+def _post(user, key):
+    header = f"HTTP_{HEADER.upper().replace('-', '_')}"
+    request = APIRequestFactory().post("/x", {"a": 1}, format="json", **{header: key})
+    force_authenticate(request, user=user)
+    return FailsFirst.as_view()(request)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_duplicate_waiting_on_a_failed_first_request_takes_over():
+    user = User.objects.create(username="idem")
+    outcomes = {}
+
+    def run(name):
+        try:
+            outcomes[name] = _post(user, "k1")
+        except ValueError as e:
+            outcomes[name] = e
+        finally:
+            connection.close()
+
+    first = threading.Thread(target=run, args=("first",))
+    first.start()
+    assert FailsFirst.started.wait(5)
+    duplicate = threading.Thread(target=run, args=("duplicate",))
+    duplicate.start()
+    time.sleep(0.3)  # let the duplicate find the in-flight key and start waiting
+    FailsFirst.release.set()
+    first.join(10)
+    duplicate.join(10)
+
+    assert isinstance(outcomes["first"], ValueError)
+    assert outcomes["duplicate"].status_code == status.HTTP_201_CREATED
+    assert outcomes["duplicate"].data == {"call": 2}
+    assert IdempotencyKey.objects.get(user=user, key="k1").status_code == status.HTTP_201_CREATED
+
+    replay = _post(user, "k1")
+    assert replay["Idempotent-Replayed"] == "true"
+    assert replay.data == {"call": 2}
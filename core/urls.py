@@ -1,17 +1,27 @@
 from django.urls import path
-from core.views.voucher import ListVouchers, PurchaseVoucher
-from core.views.voucher_eligibility import VoucherEligibility
+from core.views.voucher import ListVouchers, PurchaseVoucher, CreateVoucherOrder, VoucherOrderVouchers
+from core.views.voucher_eligibility import VoucherEligibility, BatchVoucherEligibility, VoucherAvailabilityCalendar
 from core.views.booking import CreateBooking
 from core.views.otp import RequestOTP
-from core.views.owner import OwnerBookings, ConfirmBooking, DeclineBooking, RedeemOTP
+from core.views.owner import (
+    OwnerBookings, OwnerPendingBookingsCount, ConfirmBooking, DeclineBooking, RedeemOTP, OwnerOfferInventory,
+    BulkBookingActions,
+)
 from core.views.payment import PaystackWebhook, VerifyPayment
-from core.views.admin import CoverageView, ApprovePayout, MarkPayoutPaid
+from core.views.admin import (
+    CoverageView, EligibilityCacheStats, HttpClientStats, OutboxStats, VoucherCodePoolStats, ApprovePayout,
+    MarkPayoutPaid,
+)
 
 urlpatterns = [
     # Vouchers
     path("vouchers", ListVouchers.as_view()),
     path("vouchers/purchase", PurchaseVoucher.as_view()),
+    path("vouchers/orders", CreateVoucherOrder.as_view()),
+    path("vouchers/orders/<uuid:order_id>/vouchers", VoucherOrderVouchers.as_view()),
+    path("vouchers/eligibility", BatchVoucherEligibility.as_view()),
     path("vouchers/<uuid:voucher_id>/eligibility", VoucherEligibility.as_view()),
+    path("vouchers/<uuid:voucher_id>/calendar", VoucherAvailabilityCalendar.as_view()),
 
     # Bookings
     path("bookings", CreateBooking.as_view()),
@@ -19,9 +29,12 @@ urlpatterns = [
 
     # Owner
     path("owners/bookings", OwnerBookings.as_view()),
+    path("owners/bookings/pending-count", OwnerPendingBookingsCount.as_view()),
+    path("owners/bookings/bulk", BulkBookingActions.as_view()),
     path("owners/bookings/<uuid:booking_id>/confirm", ConfirmBooking.as_view()),
     path("owners/bookings/<uuid:booking_id>/decline", DeclineBooking.as_view()),
     path("owners/bookings/<uuid:booking_id>/redeem-otp", RedeemOTP.as_view()),
+    path("owners/offers/<uuid:offer_id>/inventory", OwnerOfferInventory.as_view()),
 
     # Payments
     path("payments/webhook", PaystackWebhook.as_view()),
@@ -29,6 +42,10 @@ urlpatterns = [
 
     # Admin
     path("admin/coverage", CoverageView.as_view()),
+    path("admin/eligibility-cache", EligibilityCacheStats.as_view()),
+    path("admin/http-client", HttpClientStats.as_view()),
+    path("admin/outbox", OutboxStats.as_view()),
+    path("admin/voucher-code-pool", VoucherCodePoolStats.as_view()),
     path("admin/payouts/<uuid:payout_id>/approve", ApprovePayout.as_view()),
     path("admin/payouts/<uuid:payout_id>/mark-paid", MarkPayoutPaid.as_view()),
 ]
@@ -4,8 +4,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from core.permissions import IsAdminRole
-from core.models import VoucherProduct, OwnerOffer, Payout, PayoutStatus, AuditLog
+from core.models import VoucherProduct, OwnerOffer, Payout, PayoutStatus
 from core.serializers import PayoutSerializer
+from core.services.eligibility_cache import result_cache
+from core.services.http import http_client
+from core.services.codes import code_pool_stats
+from core.services.outbox import audit, stats as outbox_stats
 from datetime import date, timedelta
 
 
@@ -26,14 +30,9 @@ class CoverageView(APIView):
             is_active=True,
             property__is_active=True,
             property__approval_status="approved",
-            property__city=vp.city,
-            eligible_skus__contains=[vp.sku],
+            sku_index__voucher_product=vp,
             start_date__lte=end,
             end_date__gte=start,
-            property__quality_score__gte=vp.min_property_score,
-            property__quality_score__lte=vp.max_property_score,
-            property__tier__gte=vp.tier_min,
-            property__tier__lte=vp.tier_max,
         )
 
         eligible_properties = offers.values_list("property_id", flat=True).distinct().count()
@@ -51,6 +50,38 @@ class CoverageView(APIView):
         })
 
 
+class EligibilityCacheStats(APIView):
+    """Hit/miss counters for this worker process's eligibility result cache."""
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response(result_cache.stats())
+
+
+class HttpClientStats(APIView):
+    """Per-host latency, error and circuit-breaker state of this worker process's outbound HTTP client."""
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response(http_client.stats())
+
+
+class OutboxStats(APIView):
+    """Outbox queue depth and apply lag per topic (audit log, Paystack webhooks, ...)."""
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response(outbox_stats())
+
+
+class VoucherCodePoolStats(APIView):
+    """Unclaimed pre-generated voucher codes vs. the low-water mark."""
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response(code_pool_stats(request.query_params.get("prefix", "SV")))
+
+
 class ApprovePayout(APIView):
     permission_classes = [IsAdminRole]
 
@@ -62,7 +93,7 @@ class ApprovePayout(APIView):
         p.approved_at = timezone.now()
         p.save(update_fields=["status", "approved_at"])
 
-        AuditLog.objects.create(
+        audit(
             actor=request.user,
             action_type="payout_approved",
             entity_type="payout",
@@ -85,7 +116,7 @@ class MarkPayoutPaid(APIView):
         p.payment_reference = ref
         p.save(update_fields=["status", "paid_at", "payment_reference"])
 
-        AuditLog.objects.create(
+        audit(
             actor=request.user,
             action_type="payout_paid",
             entity_type="payout",
@@ -5,7 +5,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from core.models import Booking
 from core.services.otp import issue_otp_for_booking, OTPError
-from core.services.notifications import send_otp_with_fallback
+from core.services.notifications import queue_otp
 from core.serializers import RequestOTPSuccessSerializer
 
 
@@ -30,7 +30,7 @@ class RequestOTP(APIView):
         except (OTPError, ValueError) as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        delivery = send_otp_with_fallback(
+        message = queue_otp(
             booking=booking,
             otp=otp,
             to_e164=to_e164,
@@ -38,5 +38,5 @@ class RequestOTP(APIView):
             check_in_iso=booking.check_in.isoformat(),
         )
 
-        out = {"otp_expires_at": otp.expires_at, **delivery}
+        out = {"otp_expires_at": otp.expires_at, "delivered_via": "queued", "message_id": message.id}
         return Response(RequestOTPSuccessSerializer(out).data)
@@ -1,21 +1,75 @@
 from __future__ import annotations
+import uuid
+from datetime import datetime
 from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from core.permissions import IsOwner
-from core.models import Booking, BookingStatus, VoucherStatus, AuditLog
-from core.services.inventory import convert_reserved_to_booked, release_reserved_or_booked, InventoryError
-from core.serializers import BookingSerializer, VerifyOTPSerializer
+from core.models import Booking, BookingStatus, VoucherStatus, OwnerOffer
+from core.services.inventory import (
+    convert_reserved_to_booked, release_reserved_or_booked, set_nightly_capacity, InventoryError
+)
+from core.serializers import (
+    BookingSerializer, VerifyOTPSerializer, BulkInventoryEditSerializer, InventoryConflictSerializer,
+    OwnerBookingsQuerySerializer, BulkBookingActionSerializer, BookingActionResultSerializer,
+)
+from core.services.cursors import encode_cursor, decode_cursor
 from core.services.otp import verify_otp_and_complete, OTPError
+from core.services.owner_bookings import confirm_or_decline_bookings
+from core.services.outbox import audit
 
 
 class OwnerBookings(APIView):
+    """
+    Newest first, keyset-paginated on (created_at, id): pass the X-Next-Cursor
+    response header back as `cursor` for the next page.
+    """
     permission_classes = [IsOwner]
 
     def get(self, request):
-        qs = Booking.objects.select_related("property", "offer", "voucher").filter(property__owner=request.user).order_by("-created_at")
-        return Response(BookingSerializer(qs, many=True).data)
+        ser = OwnerBookingsQuerySerializer(data=request.query_params)
+        ser.is_valid(raise_exception=True)
+        params = ser.validated_data
+        limit = params["limit"]
+
+        qs = Booking.objects.filter(property__owner=request.user)
+        if "status" in params:
+            qs = qs.filter(status=params["status"])
+        if "property_id" in params:
+            qs = qs.filter(property_id=params["property_id"])
+        if "check_in_from" in params:
+            qs = qs.filter(check_in__gte=params["check_in_from"])
+        if "check_in_to" in params:
+            qs = qs.filter(check_in__lte=params["check_in_to"])
+        if params["cursor"]:
+            try:
+                created_at, booking_id = decode_cursor(params["cursor"], 2)
+                created_at, booking_id = datetime.fromisoformat(created_at), uuid.UUID(str(booking_id))
+            except (TypeError, ValueError):
+                return Response({"detail": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=booking_id))
+
+        # One extra row tells us whether another page exists
+        rows = list(qs.order_by("-created_at", "-id")[: limit + 1])
+        page = rows[:limit]
+        response = Response(BookingSerializer(page, many=True).data)
+        if len(rows) > limit:
+            response["X-Next-Cursor"] = encode_cursor(page[-1].created_at.isoformat(), page[-1].id)
+        return response
+
+
+class OwnerPendingBookingsCount(APIView):
+    """Cheap poll for the owner app: pending bookings and the earliest confirm_by."""
+    permission_classes = [IsOwner]
+
+    def get(self, request):
+        summary = Booking.objects.filter(property__owner=request.user, status=BookingStatus.PENDING).aggregate(
+            pending=Count("id"), next_confirm_by=Min("confirm_by")
+        )
+        return Response(summary)
 
 
 class ConfirmBooking(APIView):
@@ -23,7 +77,7 @@ class ConfirmBooking(APIView):
 
     def post(self, request, booking_id):
         with transaction.atomic():
-            booking = Booking.objects.select_for_update().select_related("property", "offer", "voucher").get(id=booking_id)
+            booking = Booking.objects.select_for_update(of=("self",)).select_related("property", "offer", "voucher").get(id=booking_id)
             if booking.property.owner_id != request.user.id:
                 return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
             if booking.status != BookingStatus.PENDING:
@@ -42,7 +96,7 @@ class ConfirmBooking(APIView):
             booking.status = BookingStatus.CONFIRMED
             booking.save(update_fields=["status", "updated_at"])
 
-            AuditLog.objects.create(
+            audit(
                 actor=request.user,
                 action_type="owner_confirmed",
                 entity_type="booking",
@@ -58,7 +112,7 @@ class DeclineBooking(APIView):
 
     def post(self, request, booking_id):
         with transaction.atomic():
-            booking = Booking.objects.select_for_update().select_related("property", "offer", "voucher").get(id=booking_id)
+            booking = Booking.objects.select_for_update(of=("self",)).select_related("property", "offer", "voucher").get(id=booking_id)
             if booking.property.owner_id != request.user.id:
                 return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
             if booking.status != BookingStatus.PENDING:
@@ -83,7 +137,7 @@ class DeclineBooking(APIView):
             voucher.status = VoucherStatus.ACTIVE
             voucher.save(update_fields=["status"])
 
-            AuditLog.objects.create(
+            audit(
                 actor=request.user,
                 action_type="owner_declined",
                 entity_type="booking",
@@ -94,6 +148,65 @@ class DeclineBooking(APIView):
         return Response(BookingSerializer(booking).data)
 
 
+class BulkBookingActions(APIView):
+    """
+    Confirm and/or decline up to 300 bookings in one transaction. Always 200 with one
+    result per action, in request order: confirmed, declined, not_found, not_pending
+    or inventory_conflict.
+    """
+    permission_classes = [IsOwner]
+
+    def post(self, request):
+        ser = BulkBookingActionSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        results = confirm_or_decline_bookings(
+            request.user, [(a["booking_id"], a["action"]) for a in ser.validated_data["actions"]]
+        )
+        return Response({"results": BookingActionResultSerializer(results, many=True).data})
+
+
+class OwnerOfferInventory(APIView):
+    permission_classes = [IsOwner]
+
+    def put(self, request, offer_id):
+        ser = BulkInventoryEditSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        changes = ser.validated_data["changes"]
+
+        offer = OwnerOffer.objects.select_related("property").get(id=offer_id)
+        if offer.property.owner_id != request.user.id:
+            return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+        first, last = min(changes), max(changes)
+        if first < timezone.localdate() or first < offer.start_date or last >= offer.end_date:
+            return Response(
+                {"detail": "Dates must be within the offer period and not in the past"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            try:
+                conflicts = set_nightly_capacity(offer, changes)
+            except InventoryError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+            if conflicts:
+                return Response(
+                    {
+                        "detail": "Capacity would drop below reserved + booked",
+                        "conflicts": InventoryConflictSerializer(conflicts, many=True).data,
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+            audit(
+                actor=request.user,
+                action_type="inventory_edited",
+                entity_type="offer",
+                entity_id=str(offer.id),
+                meta_data={"nights": len(changes), "from": first.isoformat(), "to": last.isoformat()},
+            )
+
+        return Response({"offer_id": str(offer.id), "nights_updated": len(changes)})
+
+
 class RedeemOTP(APIView):
     permission_classes = [IsOwner]
 
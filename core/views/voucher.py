@@ -1,13 +1,18 @@
 from __future__ import annotations
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from core.models import VoucherProduct, Voucher, Payment, VoucherStatus, PaymentStatus
-from core.serializers import VoucherSerializer, PurchaseVoucherSerializer
-from core.services.codes import generate_voucher_code
-from core.services.paystack import initialize_transaction
+from core.models import VoucherProduct, Voucher, Payment, VoucherStatus, PaymentStatus, VoucherOrder
+from core.serializers import VoucherSerializer, PurchaseVoucherSerializer, VoucherOrderSerializer
+from core.services.bulk_vouchers import EXPORTERS, create_voucher_order, fail_unpaid_order
+from core.services.codes import claim_voucher_code
+from core.services.payments import FAILED, apply_gateway_outcomes
+from core.services.paystack import PaystackError, initialize_transaction
+from core.services.idempotency import HEADER, MAX_KEY_LENGTH, idempotent
+from core.services.policy import policy_snapshot
 import secrets
 from datetime import timedelta
 
@@ -21,7 +26,9 @@ class ListVouchers(APIView):
 class PurchaseVoucher(APIView):
     """
     Creates Voucher(created) + Payment(pending), initializes Paystack transaction.
+    Retries with the same Idempotency-Key replay the first response.
     """
+    @idempotent("vouchers.purchase")
     def post(self, request):
         ser = PurchaseVoucherSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
@@ -33,11 +40,7 @@ class PurchaseVoucher(APIView):
 
         reference = f"sv_{secrets.token_hex(8)}"
         with transaction.atomic():
-            # generate unique voucher code
-            code = generate_voucher_code(prefix="SV")
-            while Voucher.objects.filter(code=code).exists():
-                code = generate_voucher_code(prefix="SV")
-
+            code = claim_voucher_code(prefix="SV")
             voucher = Voucher.objects.create(
                 voucher_product=vp,
                 user=request.user,
@@ -47,20 +50,7 @@ class PurchaseVoucher(APIView):
                 valid_until=now + timedelta(days=vp.validity_days),
                 nights_included=vp.nights,
                 sell_price_kobo=vp.sell_price_kobo,
-                policy_snapshot={
-                    "sku": vp.sku,
-                    "city": vp.city,
-                    "min_property_score": vp.min_property_score,
-                    "max_property_score": vp.max_property_score,
-                    "tier_min": vp.tier_min,
-                    "tier_max": vp.tier_max,
-                    "payout_cap_kobo": vp.payout_cap_kobo,
-                    "nights": vp.nights,
-                    "validity_days": vp.validity_days,
-                    "lead_time_hours": vp.lead_time_hours,
-                    "blackout_dates": vp.blackout_dates,
-                    "allowed_days": vp.allowed_days,
-                },
+                policy_snapshot=policy_snapshot(vp),
             )
             payment = Payment.objects.create(
                 voucher=voucher,
@@ -71,12 +61,23 @@ class PurchaseVoucher(APIView):
                 gateway="paystack",
             )
 
-        ps = initialize_transaction(
-            email=email,
-            amount_kobo=payment.amount_kobo,
-            reference=payment.reference,
-            metadata={"voucher_id": str(voucher.id), "sku": vp.sku, "user_id": request.user.id},
-        )
+        try:
+            ps = initialize_transaction(
+                email=email,
+                amount_kobo=payment.amount_kobo,
+                reference=payment.reference,
+                metadata={"voucher_id": str(voucher.id), "sku": vp.sku, "user_id": request.user.id},
+            )
+        except PaystackError as e:
+            # Fail the payment and expire the voucher now, so a retry with the same
+            # Idempotency-Key (released on 5xx) leaves no pending orphan behind.
+            apply_gateway_outcomes(
+                {payment.reference: (FAILED, {"initialize_error": str(e)})}, expire_failed_vouchers=True
+            )
+            return Response(
+                {"detail": "Could not start the payment; the purchase was cancelled"},
+                status=status.HTTP_502_BAD_GATEWAY,
+            )
 
         return Response(
             {
@@ -87,3 +88,106 @@ class PurchaseVoucher(APIView):
             },
             status=status.HTTP_201_CREATED,
         )
+
+
+def _export_response(order: VoucherOrder, fmt: str, **headers) -> StreamingHttpResponse:
+    stream, content_type = EXPORTERS[fmt]
+    response = StreamingHttpResponse(stream(order), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="voucher-order-{order.id}.{fmt}"'
+    response["X-Order-Id"] = str(order.id)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+class CreateVoucherOrder(APIView):
+    """
+    Bulk purchase: one order, one Paystack transaction for quantity x sell price, and
+    `quantity` vouchers (CREATED until the payment succeeds). The vouchers are streamed
+    back as CSV or NDJSON; payment details are in X-Payment-Reference and
+    X-Authorization-Url. An Idempotency-Key is stored on the order, so a retry streams
+    the existing order again (Idempotent-Replayed: true) instead of creating another.
+    """
+    def post(self, request):
+        ser = VoucherOrderSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        data = ser.validated_data
+        key = request.headers.get(HEADER, "")
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        vp = VoucherProduct.objects.get(sku=data["sku"], is_active=True)
+
+        if key and VoucherOrder.objects.filter(user=request.user, idempotency_key=key).exists():
+            return self._replay(request, key, vp, data)
+        try:
+            order, payment = create_voucher_order(
+                user=request.user, voucher_product=vp, quantity=data["quantity"], idempotency_key=key
+            )
+        except IntegrityError:
+            # A concurrent request with the same key committed its order first
+            if not key or not VoucherOrder.objects.filter(user=request.user, idempotency_key=key).exists():
+                raise
+            return self._replay(request, key, vp, data)
+
+        try:
+            ps = initialize_transaction(
+                email=data["email"],
+                amount_kobo=payment.amount_kobo,
+                reference=payment.reference,
+                metadata={"order_id": str(order.id), "sku": vp.sku, "quantity": order.quantity, "user_id": request.user.id},
+            )
+        except PaystackError as e:
+            fail_unpaid_order(order, payment, str(e))
+            return Response(
+                {"detail": "Could not start the payment; the order was cancelled", "order_id": str(order.id)},
+                status=status.HTTP_502_BAD_GATEWAY,
+            )
+        Payment.objects.filter(pk=payment.pk).update(gateway_payload=ps)
+
+        response = _export_response(
+            order, data["output"],
+            **{"X-Payment-Reference": payment.reference, "X-Authorization-Url": ps.get("authorization_url", "")},
+        )
+        response.status_code = status.HTTP_201_CREATED
+        return response
+
+    def _replay(self, request, key, vp, data):
+        order = VoucherOrder.objects.get(user=request.user, idempotency_key=key)
+        if order.voucher_product_id != vp.sku or order.quantity != data["quantity"]:
+            return Response(
+                {"detail": f"{HEADER} was already used with a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        payment = Payment.objects.get(order=order)
+        authorization_url = (payment.gateway_payload or {}).get("authorization_url", "")
+        if payment.status == PaymentStatus.PENDING and not authorization_url:
+            return Response(
+                {"detail": f"A request with this {HEADER} is still in progress"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        response = _export_response(
+            order, data["output"],
+            **{
+                "X-Payment-Reference": payment.reference,
+                "X-Authorization-Url": authorization_url,
+                "Idempotent-Replayed": "true",
+            },
+        )
+        response.status_code = status.HTTP_201_CREATED
+        return response
+
+
+class VoucherOrderVouchers(APIView):
+    """Re-download an order's vouchers (`output=csv|ndjson`) with their current status."""
+    def get(self, request, order_id):
+        order = VoucherOrder.objects.filter(id=order_id, user=request.user).first()
+        if order is None:
+            return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+        # not `format`: DRF reserves that query parameter for renderer selection
+        fmt = request.query_params.get("output", "csv")
+        if fmt not in EXPORTERS:
+            return Response({"detail": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        return _export_response(order, fmt)
@@ -1,10 +1,18 @@
 from __future__ import annotations
+import uuid
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from core.models import Voucher
-from core.serializers import EligibilityRequestSerializer, EligibleOfferSerializer
-from core.services.eligibility import validate_voucher_active, validate_dates, query_eligible_offers, EligibilityError
+from core.models import Voucher, VoucherStatus
+from core.serializers import (
+    EligibilityRequestSerializer, EligibleOfferSerializer, AvailabilityCalendarRequestSerializer,
+    AvailabilityDaySerializer, BatchEligibilityRequestSerializer, VoucherEligibilityResultSerializer,
+)
+from core.services.eligibility import validate_voucher_active, validate_dates, EligibilityError
+from core.services.eligibility_cache import cached_eligible_offer_rows
+from core.services.cursors import encode_cursor, decode_cursor
+from core.services.calendar import availability_calendar
 
 
 class VoucherEligibility(APIView):
@@ -15,6 +23,7 @@ class VoucherEligibility(APIView):
         voucher = Voucher.objects.select_related("voucher_product").get(id=voucher_id, user=request.user)
         check_in = ser.validated_data["check_in"]
         check_out = ser.validated_data["check_out"]
+        limit = ser.validated_data["limit"]
 
         try:
             validate_voucher_active(voucher)
@@ -22,16 +31,82 @@ class VoucherEligibility(APIView):
         except EligibilityError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = query_eligible_offers(voucher, check_in, check_out)
+        after = None
+        if ser.validated_data["cursor"]:
+            try:
+                score, rate, offer_id = decode_cursor(ser.validated_data["cursor"], 3)
+                after = (int(score), int(rate), uuid.UUID(str(offer_id)))
+            except (TypeError, ValueError):
+                return Response({"detail": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only offer rooms that can still take a booking (CreateBooking reserves one unit).
+        # One extra row tells us whether another page exists.
+        rows = cached_eligible_offer_rows(voucher, check_in, check_out, units=1, limit=limit + 1, after=after)
+        page = rows[:limit]
+
+        response = Response(EligibleOfferSerializer(page, many=True).data)
+        if len(rows) > limit:
+            last = page[-1]
+            response["X-Next-Cursor"] = encode_cursor(last["effective_score"], last["private_rate_kobo"], last["offer_id"])
+        return response
+
+
+class BatchVoucherEligibility(APIView):
+    """
+    Eligibility for all of the caller's active vouchers for one stay. Vouchers of the
+    same SKU share one candidate lookup, so DB work scales with distinct SKUs.
+    """
+
+    def post(self, request):
+        ser = BatchEligibilityRequestSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        check_in = ser.validated_data["check_in"]
+        check_out = ser.validated_data["check_out"]
+        limit = ser.validated_data["limit"]
+
+        vouchers = (
+            Voucher.objects.select_related("voucher_product")
+            .filter(user=request.user, status=VoucherStatus.ACTIVE)
+            .order_by("created_at")
+        )
+        by_sku = {}
         payload = []
-        for offer, score in results[:30]:
-            payload.append({
-                "offer_id": offer.id,
-                "property_id": offer.property_id,
-                "property_name": offer.property.name,
-                "room_type": offer.room_type,
-                "private_rate_kobo": offer.private_rate_kobo,
-                "auto_confirm": offer.auto_confirm,
-                "effective_score": score,
-            })
-        return Response(EligibleOfferSerializer(payload, many=True).data)
+        for voucher in vouchers:
+            entry = {
+                "voucher_id": voucher.id,
+                "voucher_code": voucher.code,
+                "sku": voucher.voucher_product_id,
+                "detail": "",
+                "offers": [],
+            }
+            payload.append(entry)
+            try:
+                validate_voucher_active(voucher)
+                validate_dates(voucher, check_in, check_out)
+            except EligibilityError as e:
+                entry["detail"] = str(e)
+                continue
+            sku = voucher.voucher_product_id
+            if sku not in by_sku:
+                by_sku[sku] = cached_eligible_offer_rows(voucher, check_in, check_out, units=1, limit=limit)
+            entry["offers"] = by_sku[sku]
+
+        return Response(VoucherEligibilityResultSerializer(payload, many=True).data)
+
+
+class VoucherAvailabilityCalendar(APIView):
+    """Per check-in date availability for the voucher over a window (flexible dates)."""
+
+    def get(self, request, voucher_id):
+        ser = AvailabilityCalendarRequestSerializer(data=request.query_params)
+        ser.is_valid(raise_exception=True)
+
+        voucher = Voucher.objects.select_related("voucher_product").get(id=voucher_id, user=request.user)
+        try:
+            validate_voucher_active(voucher)
+        except EligibilityError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = ser.validated_data.get("start") or timezone.localdate()
+        days = availability_calendar(voucher, start, ser.validated_data["days"], units=1)
+        return Response(AvailabilityDaySerializer(days, many=True).data)
@@ -118,13 +118,91 @@ CORS_ALLOWED_ORIGINS = os.getenv(
     "CORS_ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:5173"
 ).split(",")
 
+# Cache (shared across processes when REDIS_URL is set)
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Eligibility result cache (per process; invalidated via version keys in CACHES)
+ELIGIBILITY_CACHE_SIZE = int(os.getenv("ELIGIBILITY_CACHE_SIZE", "2048"))
+ELIGIBILITY_CACHE_TTL_SECONDS = int(os.getenv("ELIGIBILITY_CACHE_TTL_SECONDS", "60"))
+
+# Inventory engine: "locking" (SELECT ... FOR UPDATE, then UPDATE) or
+# "conditional" (single guarded UPDATE ... RETURNING per operation)
+INVENTORY_ENGINE = os.getenv("INVENTORY_ENGINE", "locking")
+# OfferInventoryDay rows are materialized this many days ahead (extend_inventory_horizon)
+INVENTORY_HORIZON_DAYS = int(os.getenv("INVENTORY_HORIZON_DAYS", "365"))
+# Inventory storage: "rows" (OfferInventoryDay, one row per night) or "monthly"
+# (OfferInventoryMonth, per-month arrays; INVENTORY_ENGINE does not apply).
+# Switch with the migrate_inventory_storage command.
+INVENTORY_STORAGE = os.getenv("INVENTORY_STORAGE", "rows")
+
+# Idempotency-Key support (PurchaseVoucher, CreateBooking)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+# How long a duplicate waits for the in-flight original before getting 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# An in-flight claim older than this is presumed dead and may be taken over
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+
+# Transactional outbox (drain_outbox): processed events are kept this long
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+# Failed deliveries back off exponentially; after this many the event is dead-lettered
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+
+# Outbound HTTP client (Paystack, messaging providers): keep-alive connections per host,
+# split timeouts, retries with jittered backoff on idempotent calls, per-host circuit breaker
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.5"))
+HTTP_BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+HTTP_BREAKER_RESET_SECONDS = float(os.getenv("HTTP_BREAKER_RESET_SECONDS", "30"))
+
+# Pre-generated voucher codes (refill_voucher_codes): pool size to refill to, and the
+# level below which the refill loop tops it up and warns
+VOUCHER_CODE_POOL_SIZE = int(os.getenv("VOUCHER_CODE_POOL_SIZE", "20000"))
+VOUCHER_CODE_POOL_LOW_WATER = int(os.getenv("VOUCHER_CODE_POOL_LOW_WATER", "5000"))
+
+# Bulk voucher orders (POST vouchers/orders, issue_vouchers)
+BULK_VOUCHER_MAX_QUANTITY = int(os.getenv("BULK_VOUCHER_MAX_QUANTITY", "50000"))
+
+# Payment reconciliation (reconcile_payments): pending payments older than this are
+# re-verified; ones Paystack has never seen are failed after PAYMENT_ABANDON_HOURS
+PAYMENT_RECONCILE_AFTER_MINUTES = int(os.getenv("PAYMENT_RECONCILE_AFTER_MINUTES", "60"))
+PAYMENT_ABANDON_HOURS = int(os.getenv("PAYMENT_ABANDON_HOURS", "24"))
+PAYMENT_RECONCILE_WORKERS = int(os.getenv("PAYMENT_RECONCILE_WORKERS", "8"))
+
 # Paystack Configuration
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY", "")
 PAYSTACK_PUBLIC_KEY = os.getenv("PAYSTACK_PUBLIC_KEY", "")
+# Point at `manage.py fake_paystack` (e.g. http://127.0.0.1:8090) for offline load/integration tests
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
 
-# Notification Providers
+# Notification Providers: "stub", or "whatsapp_cloud" / "termii"
 WHATSAPP_PROVIDER = os.getenv("WHATSAPP_PROVIDER", "stub")
 SMS_PROVIDER = os.getenv("SMS_PROVIDER", "stub")
+WHATSAPP_CLOUD_TOKEN = os.getenv("WHATSAPP_CLOUD_TOKEN", "")
+WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID", "")
+WHATSAPP_TEMPLATE_LANGUAGE = os.getenv("WHATSAPP_TEMPLATE_LANGUAGE", "en")
+TERMII_API_KEY = os.getenv("TERMII_API_KEY", "")
+TERMII_SENDER_ID = os.getenv("TERMII_SENDER_ID", "StayFlex")
+
+# Outbound message dispatcher (dispatch_messages): concurrent sends per channel,
+# attempts per channel before giving up (WhatsApp then falls back to SMS), retry backoff
+# base and the lease after which a message stuck in SENDING is retried
+MESSAGE_CONCURRENCY = {
+    "whatsapp": int(os.getenv("MESSAGE_WHATSAPP_CONCURRENCY", "8")),
+    "sms": int(os.getenv("MESSAGE_SMS_CONCURRENCY", "4")),
+}
+MESSAGE_MAX_ATTEMPTS = {
+    "whatsapp": int(os.getenv("MESSAGE_WHATSAPP_MAX_ATTEMPTS", "2")),
+    "sms": int(os.getenv("MESSAGE_SMS_MAX_ATTEMPTS", "3")),
+}
+MESSAGE_RETRY_BASE_SECONDS = float(os.getenv("MESSAGE_RETRY_BASE_SECONDS", "2"))
+MESSAGE_SEND_TIMEOUT_SECONDS = int(os.getenv("MESSAGE_SEND_TIMEOUT_SECONDS", "60"))
 
 # Logging
 LOGGING = {